@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from pymongo import DeleteOne, UpdateOne
+from storage import on_ingest, normalize_term, tokens
+from search_index import get_index
+
+# --- ALERT MATCHING ---
+# Alerts are evaluated when prices are written, not when /profile is viewed. Each match
+# updates the alert itself (current_price, current_source, current_at, target_met), so the
+# profile page's watchlist is one indexed query on alerts. Targets that are met are also
+# materialized into db.notifications, which the profile page lists.
+INDEX_SECONDS = float(os.environ.get("ALERT_INDEX_SECONDS", 30))
+
+class AlertIndex:
+    """Active alerts grouped by normalized term, with token postings to find candidate terms."""
+    def __init__(self, alerts):
+        self.by_term = {}
+        self.postings = {}
+        for alert in alerts:
+            term = normalize_term(alert.get('term') or alert['item_name'])
+            self.by_term.setdefault(term, []).append(alert)
+            for token in tokens(term):
+                self.postings.setdefault(token, set()).add(term)
+
+    def match(self, name):
+        """Terms contained in the normalized name (what the old case-insensitive $regex did)."""
+        candidates = set()
+        for token in tokens(name):
+            candidates |= self.postings.get(token, set())
+        return [term for term in candidates if term in name]
+
+_index = {'at': 0.0, 'value': None}
+_index_lock = threading.Lock()
+
+def invalidate():
+    with _index_lock:
+        _index['value'] = None
+
+def alert_index(db):
+    with _index_lock:
+        if _index['value'] is not None and time.monotonic() - _index['at'] < INDEX_SECONDS:
+            return _index['value']
+    alerts = list(db.alerts.find({"active": True}, {"item_name": 1, "term": 1, "user_id": 1, "target_price": 1}))
+    index = AlertIndex(alerts)
+    with _index_lock:
+        _index['value'] = index
+        _index['at'] = time.monotonic()
+    return index
+
+def _match_update(alert, record):
+    """Sets the alert's latest observed price unless a newer one is already stored."""
+    met = record['price'] <= alert['target_price']
+    return UpdateOne(
+        {"_id": alert['_id'], "$or": [{"current_at": {"$exists": False}}, {"current_at": {"$lte": record['created_at']}}]},
+        {"$set": {
+            "current_price": record['price'],
+            "current_source": record['source'],
+            "current_at": record['created_at'],
+            "target_met": met,
+        }}
+    )
+
+def _notification(alert, record):
+    """Upserts the alert's notification when its target is met, removes it otherwise."""
+    if record['price'] > alert['target_price']:
+        return DeleteOne({"alert_id": alert['_id']})
+    return UpdateOne(
+        {"alert_id": alert['_id']},
+        {"$set": {
+            "user_id": alert['user_id'],
+            "title": f"Price Drop: {alert['item_name']}",
+            "message": f"Found at {record['source']} for KSh {record['price']}!",
+            "is_offer": True,
+            "created_at": record['created_at'],
+        }},
+        upsert=True
+    )
+
+def evaluate(db, records):
+    """Matches new price records against active alerts and stores the outcome."""
+    index = alert_index(db)
+    if not index.by_term:
+        return 0
+
+    # Latest record per alert term; on equal timestamps the cheaper one wins
+    latest = {}
+    for record in records:
+        name = normalize_term(record.get('commodity_name'))
+        for term in index.match(name):
+            best = latest.get(term)
+            if best is None or (record['created_at'], -record['price']) > (best['created_at'], -best['price']):
+                latest[term] = record
+
+    updates = []
+    notifications = []
+    for term, record in latest.items():
+        for alert in index.by_term[term]:
+            updates.append(_match_update(alert, record))
+            notifications.append(_notification(alert, record))
+    if updates:
+        db.alerts.bulk_write(updates, ordered=False)
+        db.notifications.bulk_write(notifications, ordered=False)
+    return len(updates)
+
+def evaluate_alert(db, alert):
+    """Initial evaluation when an alert is created or its target changes."""
+    if alert.get('current_price') is None:
+        # Every stored commodity name containing the alert's term, via the search index
+        index = get_index(db)
+        names = [n for key in index.containing(alert['item_name'], 'scrapped_items')
+                 for n in index.names(key, 'scrapped_items')]
+        latest = db.scrapped_items.find_one(
+            {"commodity_name": {"$in": names}},
+            sort=[("created_at", -1)]
+        ) if names else None
+        if latest:
+            db.alerts.bulk_write([_match_update(alert, latest)])
+            alert = db.alerts.find_one({"_id": alert['_id']})
+    else:
+        met = alert['current_price'] <= alert['target_price']
+        db.alerts.update_one({"_id": alert['_id']}, {"$set": {"target_met": met}})
+        alert['target_met'] = met
+
+    if alert.get('current_price') is not None:
+        current = {"source": alert['current_source'], "price": alert['current_price'], "created_at": alert['current_at']}
+        db.notifications.bulk_write([_notification(alert, current)])
+    invalidate()
+
+@on_ingest
+def match_alerts(db, collection_name, records, inserted):
+    if collection_name == 'scrapped_items':
+        evaluate(db, records)
+
+if __name__ == '__main__':
+    # One-off backfill for alerts created before ingest-time matching
+    from database import connect
+    db = connect()
+    alerts = list(db.alerts.find({"active": True}))
+    for alert in alerts:
+        evaluate_alert(db, alert)
+    print(f"✅ Evaluated {len(alerts)} alerts")
@@ -1,11 +1,21 @@
-from flask import Flask, render_template, redirect, url_for, flash, jsonify, request
-from pymongo import MongoClient, DESCENDING
-from dotenv import load_dotenv
-import os
+from flask import Flask, render_template, redirect, url_for, flash, jsonify, request, Response, stream_with_context, g
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import statistics
+import json
+import time
 from datetime import datetime
-from pathlib import Path
-from scraper import scrape_real_data, scrape_single_item
+from database import connect, check_server_version
+import jobs
+from indexes import ensure_indexes
+from live_search import LIVE_SOURCES, stale_sources, queue_live_search
+from storage import normalize_term
+from summaries import category_summary
+from alerts import evaluate_alert
+from history import parse_range, price_series, latest_by_source, recent_records
+from rollups import category_cards
+from search_index import get_index
+import metrics
 
 # --- NEW IMPORTS FOR AUTH ---
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
@@ -13,16 +23,40 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from bson.objectid import ObjectId
 
 # --- SETUP ---
-env_path = Path(__file__).parent / '.env'
-load_dotenv(dotenv_path=env_path)
-
-mongo_uri = os.environ.get("MONGO_URI")
-client = MongoClient(mongo_uri)
-db = client.get_default_database('chakula_db')
+metrics.configure_logging()
+db = connect()
+check_server_version(db)
+ensure_indexes(db)
+
+# Live-search result streams poll the job every STREAM_POLL_SECONDS, backing off to
+# STREAM_MAX_POLL_SECONDS while nothing changes, and give up after STREAM_TIMEOUT_SECONDS.
+# Each open stream holds a server thread, so run the app threaded (see README).
+STREAM_POLL_SECONDS = 0.5
+STREAM_MAX_POLL_SECONDS = 3
+STREAM_TIMEOUT_SECONDS = 120
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'
 
+# --- REQUEST METRICS ---
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Route template rather than the raw path, so /api/details/<comm_name> is one series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - started, route=route,
+                                     method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
 # --- AUTH SETUP ---
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -60,13 +94,18 @@ def register():
         # Secure Password Hashing
         hashed_password = generate_password_hash(password)
         
-        db.users.insert_one({
-            "name": name,
-            "email": email,
-            "password": hashed_password,
-            "role": role,
-            "created_at": datetime.utcnow()
-        })
+        try:
+            db.users.insert_one({
+                "name": name,
+                "email": email,
+                "password": hashed_password,
+                "role": role,
+                "created_at": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            # Lost a race with another sign-up for the same email (users.email is unique)
+            flash("Email already exists. Please login.", "error")
+            return redirect(url_for('register'))
         flash("Account created! Please log in.", "success")
         return redirect(url_for('login'))
         
@@ -101,44 +140,27 @@ def logout():
 
 @app.route('/')
 def home():
-    categories = db.scrapped_items.distinct("category") or ['Food', 'Home']
-    cat_data = [{"name": c, "count": db.scrapped_items.count_documents({"category": c})} for c in categories]
+    cat_data = category_summary(db)
     return render_template('home.html', categories=cat_data)
 
 @app.route('/dashboard')
 def dashboard_categories():
-    categories = db.scrapped_items.distinct("category") or ['Food', 'Home']
-    cat_data = [{"name": c, "count": db.scrapped_items.count_documents({"category": c})} for c in categories]
+    cat_data = category_summary(db)
     return render_template('categories.html', categories=cat_data)
 
 @app.route('/category/<category_name>')
 def category_dashboard(category_name):
-    # (Same pipeline as before)
-    pipeline = [
-        {"$match": {"category": category_name}},
-        {"$sort": {"price": 1}},
-        {
-            "$group": {
-                "_id": "$commodity_name",
-                "cheapest_price": {"$first": "$price"},
-                "cheapest_source": {"$first": "$source"},
-                "avg_price": {"$avg": "$price"},
-                "max_price": {"$max": "$price"},
-                "sources": {"$addToSet": "$source"},
-                "source_count": {"$sum": 1}
-            }
-        }
-    ]
-    results = list(db.scrapped_items.aggregate(pipeline))
+    # Daily rollups (rollups.py) keep this independent of the number of raw observations
+    results = category_cards(db, category_name)
     cards = []
     for item in results:
         cards.append({
             'name': item['_id'], 
             'cheapest_price': item['cheapest_price'],
             'cheapest_source': item['cheapest_source'],
-            'avg_price': round(item['avg_price'], 0),
+            'avg_price': round(item['sum'] / item['count'], 0),
             'max_price': item['max_price'],
-            'source_count': item['source_count'],
+            'source_count': len(item['sources']),
             'sources_list': ", ".join(item['sources'])
         })
     return render_template('dashboard.html', items=cards, category=category_name)
@@ -148,9 +170,10 @@ def category_dashboard(category_name):
 @app.route('/scrape-dashboard')
 @login_required  # Only logged in users can trigger scrape
 def scrape_dashboard_action():
+    # Scraping runs in worker.py; we only queue it
     try:
-        count = scrape_real_data(db)
-        flash(f"Updated! Scraped {count} prices.", "success")
+        jobs.enqueue(db, 'dashboard')
+        flash("Update started! New prices will appear in a few minutes.", "success")
     except Exception as e:
         flash(f"Update failed: {str(e)}", "error")
     return redirect(url_for('dashboard_categories'))
@@ -163,53 +186,102 @@ def check_specific_item():
             flash("Please enter an item name", "error")
             return redirect(url_for('check_specific_item'))
 
-        count = scrape_single_item(db, item_name, ['Naivas', 'Jumia', 'Carrefour'])
-        
-        if count > 0:
+        # Only re-scrape the supermarkets whose stored results are out of date
+        stale = stale_sources(db, item_name)
+        if not stale:
             return redirect(url_for('search_results', q=item_name))
-        else:
-            flash(f"Could not find '{item_name}'.", "error")
-            return redirect(url_for('check_specific_item'))
+
+        job_id = queue_live_search(db, item_name, stale)
+        # The results page streams each supermarket in as the job reports it
+        return redirect(url_for('search_results', q=item_name, job=str(job_id)))
 
     return render_template('check_item.html')
 
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get_job(db, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.route('/api/jobs/<job_id>/stream')
+def job_stream(job_id):
+    """Server-Sent Events: one 'source' event per supermarket as the live-search job finishes
+    it (with that source's latest product), then 'done'."""
+    job = jobs.get_job(db, job_id)
+    if not job or job['kind'] != 'item':
+        return jsonify({'error': 'Job not found'}), 404
+
+    search_key = normalize_term(job['params']['item_name'])
+    targets = job['params'].get('targets') or LIVE_SOURCES
+
+    @stream_with_context
+    def events():
+        sent = set()
+        started = time.monotonic()
+        poll = STREAM_POLL_SECONDS
+        while True:
+            current = jobs.get_job(db, job_id)
+            for source, found in current['sources'].items():
+                if source in sent:
+                    continue
+                sent.add(source)
+                poll = STREAM_POLL_SECONDS
+                item = None
+                if found:
+                    latest = latest_by_source(db, 'live_searches', {"search_key": search_key, "source": source})
+                    if latest:
+                        item = {k: latest[0].get(k) for k in ('source', 'product_name', 'description', 'price', 'created_at')}
+                yield _sse('source', {'source': source, 'found': bool(item), 'item': item})
+
+            # Joining searches may add sources while the job is queued; once it is done only its
+            # late sources are left to wait for
+            watched = current['params'].get('targets') or targets
+            late = (current['result'] or {}).get('late', watched) if current['status'] == jobs.DONE else watched
+            pending = [t for t in late if t not in sent]
+            finished = not pending or current['status'] == jobs.FAILED
+            timed_out = not finished and time.monotonic() - started > STREAM_TIMEOUT_SECONDS
+            if finished or timed_out:
+                yield _sse('done', {'status': current['status'], 'error': current['error'],
+                                    'timed_out': timed_out, 'pending': pending})
+                return
+            time.sleep(poll)
+            poll = min(poll * 2, STREAM_MAX_POLL_SECONDS)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/search-results')
 def search_results():
-    # (Same graph logic as before)
     query = request.args.get('q', '').strip()
-    history = list(db.live_searches.find({"search_term": query}).sort("created_at", 1))
+    # With a running job the page fills in as each supermarket finishes
+    job_id = request.args.get('job')
+    search_key = normalize_term(query)
+    current_results = latest_by_source(db, 'live_searches', {"search_key": search_key})
+    if not current_results and not job_id:
+        # Close variants ("1kg sugar", "kabras sugar") resolve to a stored term via the search index
+        resolved = get_index(db).resolve(query, 'live_searches')
+        if resolved and resolved != search_key:
+            search_key = resolved
+            current_results = latest_by_source(db, 'live_searches', {"search_key": search_key})
     
-    if not history: return redirect(url_for('check_specific_item'))
-
-    latest_by_source = {}
-    for entry in history: latest_by_source[entry['source']] = entry
-    current_results = list(latest_by_source.values())
+    if not current_results and not job_id: return redirect(url_for('check_specific_item'))
     
-    prices = [r['price'] for r in current_results]
-    stats = {
-        'min': min(prices), 'max': max(prices),
-        'avg': round(sum(prices)/len(prices), 2),
-        'best': min(current_results, key=lambda x: x['price'])
-    }
-
-    # Graph Data Prep
-    dates = sorted(list(set(row['created_at'].strftime('%Y-%m-%d') for row in history)))
-    datasets = []
-    colors = {'Naivas': '#ef4444', 'Jumia': '#f97316', 'Carrefour': '#3b82f6'}
-    for source in ['Naivas', 'Jumia', 'Carrefour']:
-        source_data = [d for d in history if d['source'] == source]
-        price_map = {d['created_at'].strftime('%Y-%m-%d'): d['price'] for d in source_data}
-        data_points = [price_map.get(date, None) for date in dates]
-        if any(p is not None for p in data_points):
-            datasets.append({
-                'label': source, 'data': data_points,
-                'borderColor': colors.get(source, '#ccc'),
-                'backgroundColor': colors.get(source, '#ccc'),
-                'fill': False, 'tension': 0.1
-            })
+    stats = None
+    if current_results:
+        prices = [r['price'] for r in current_results]
+        stats = {
+            'min': min(prices), 'max': max(prices),
+            'avg': round(sum(prices)/len(prices), 2),
+            'best': min(current_results, key=lambda x: x['price'])
+        }
 
-    graph_data = {'labels': dates, 'datasets': datasets}
-    return render_template('search_result.html', query=query, items=current_results, stats=stats, graph=graph_data)
+    start, end, bucket = parse_range(request.args)
+    graph_data = price_series(db, 'live_searches', search_key, start, end, bucket)
+    stream_url = url_for('job_stream', job_id=job_id) if job_id else None
+    return render_template('search_result.html', query=query, items=current_results, stats=stats, graph=graph_data, stream_url=stream_url)
 
 # --- PROTECTED USER FEATURES ---
 
@@ -220,39 +292,31 @@ def subscribe_alert():
     item_name = data.get('item_name')
     target_price = data.get('target_price')
     
-    db.alerts.update_one(
+    alert = db.alerts.find_one_and_update(
         {"item_name": item_name, "user_id": current_user.id}, # Link to specific user
-        {"$set": {"target_price": float(target_price), "active": True, "created_at": datetime.utcnow()}},
-        upsert=True
+        {"$set": {"target_price": float(target_price), "term": normalize_term(item_name), "active": True, "created_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    evaluate_alert(db, alert)
     return jsonify({'status': 'success', 'message': 'Alert set!'})
 
 @app.route('/profile')
 @login_required
 def profile():
-    # Fetch ONLY this user's alerts
-    my_alerts = list(db.alerts.find({"user_id": current_user.id, "active": True}))
-    notifications = []
+    # Fetch ONLY this user's alerts; prices are matched against them when scraped (see alerts.py)
+    my_alerts = db.alerts.find({"user_id": current_user.id, "active": True})
+    # Met targets are kept in db.notifications by the same matching, newest first
+    notifications = list(db.notifications.find({"user_id": current_user.id}, {"title": 1, "message": 1, "is_offer": 1})
+                         .sort("created_at", DESCENDING))
     watching = []
 
     for alert in my_alerts:
-        latest = db.scrapped_items.find_one(
-            {"commodity_name": {"$regex": alert['item_name'], "$options": "i"}},
-            sort=[("created_at", -1)]
-        )
         item_data = {"item": alert['item_name'], "target": alert['target_price'], "current": "N/A", "status": "Pending"}
         
-        if latest:
-            item_data['current'] = f"KSh {latest['price']}"
-            if latest['price'] <= alert['target_price']:
-                notifications.append({
-                    "title": f"Price Drop: {alert['item_name']}",
-                    "message": f"Found at {latest['source']} for KSh {latest['price']}!",
-                    "is_offer": True
-                })
-                item_data['status'] = "Target Met! 🎉"
-            else:
-                item_data['status'] = "Price too high"
+        if alert.get('current_price') is not None:
+            item_data['current'] = f"KSh {alert['current_price']}"
+            item_data['status'] = "Target Met! 🎉" if alert.get('target_met') else "Price too high"
         watching.append(item_data)
 
     return render_template('notifications.html', user=current_user, notifications=notifications, watching=watching)
@@ -280,21 +344,23 @@ def inventory():
 
 @app.route('/api/details/<comm_name>')
 def get_item_details(comm_name):
-    
-    data = list(db.scrapped_items.find({"commodity_name": comm_name}).sort("created_at", 1))
-    if not data: return jsonify({'error': 'No data'})
-    for doc in data: doc['_id'] = str(doc['_id']) # Fix ObjectId error
-    
-    dates = sorted(list(set(row['created_at'].strftime('%Y-%m-%d') for row in data)))
-    datasets = {}
-    colors = {'Naivas': '#ef4444', 'Jumia': '#f97316', 'Carrefour': '#3b82f6'}
-    for source in ["Naivas", "Jumia", "Carrefour"]:
-        prices = []
-        source_data = {d['created_at'].strftime('%Y-%m-%d'): d['price'] for d in data if d['source'] == source}
-        for date in dates: prices.append(source_data.get(date, None))
-        datasets[source] = {'label': source, 'data': prices, 'borderColor': colors.get(source, '#ccc'), 'backgroundColor': colors.get(source, '#ccc')}
-
-    return jsonify({'graph': {'labels': dates, 'datasets': list(datasets.values())}, 'sources': data[-15:]})
+    # Every name the product was stored under ("Sugar 1kg", "Sugar 1 Kg"), via the search index
+    index = get_index(db)
+    key = normalize_term(comm_name)
+    names = sorted({comm_name, *index.names(key, 'scrapped_items')})
+    sources = recent_records(db, 'scrapped_items', {"commodity_name": {"$in": names}})
+    if not sources:
+        # Only a close variant when the name itself has no rows
+        resolved = index.resolve(comm_name, 'scrapped_items')
+        if resolved and resolved != key:
+            names = index.names(resolved, 'scrapped_items')
+            sources = recent_records(db, 'scrapped_items', {"commodity_name": {"$in": names}})
+
+    start, end, bucket = parse_range(request.args)
+    # Raw rows expire (retention.py) but the daily rollups behind the chart are kept
+    graph = price_series(db, 'scrapped_items', names, start, end, bucket)
+    if not sources and not graph['labels']: return jsonify({'error': 'No data'})
+    return jsonify({'graph': graph, 'sources': sources})
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""Load benchmark for the read-path Flask routes.
+
+Runs each route with N concurrent clients for a fixed time against a running app and reports
+requests/sec and p50/p95/p99 latency. Seed the database first (seed.py) to see how each route
+behaves at that data size; /profile logs in as the seeded users.
+
+    python seed.py --drop --items 2000000 --live 500000 --users 50000
+    python app.py   # or any WSGI server
+    python bench_routes.py --url http://localhost:5000 --concurrency 1,8,32 --duration 15
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote
+import requests
+from seed import commodity_names
+
+# --- ROUTES ---
+# name -> function(rng) returning a path; one session per client keeps the login cookie.
+ROUTES = {
+    'home': lambda rng: "/",
+    'category': lambda rng: f"/category/{rng.choice(['Food', 'Home'])}",
+    'search_results': lambda rng: f"/search-results?q={quote(rng.choice(commodity_names()).lower())}",
+    'details': lambda rng: f"/api/details/{quote(rng.choice(commodity_names()))}",
+    'profile': lambda rng: "/profile",
+}
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+def new_session(base_url, user_index, password):
+    session = requests.Session()
+    response = session.post(f"{base_url}/login", allow_redirects=False,
+                            data={"email": f"user{user_index}@example.com", "password": password})
+    if response.status_code != 302:
+        print(f"⚠️ Login failed for user{user_index}@example.com (seed users with seed.py)")
+    return session
+
+def run_route(base_url, route, concurrency, duration, users, password):
+    """Hammers one route with `concurrency` clients for `duration` seconds."""
+    sessions = [new_session(base_url, i % max(users, 1), password) if route == 'profile' else requests.Session()
+                for i in range(concurrency)]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        rng = random.Random(index)
+        session = sessions[index]
+        own, failed = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                # Redirects count as answers: /search-results sends unknown terms to the search page
+                response = session.get(base_url + ROUTES[route](rng), allow_redirects=False, timeout=60)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            own.append(time.perf_counter() - started)
+            failed += not ok
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        'route': route,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+    }
+
+def data_sizes():
+    """Document counts of the collections the routes read, when the database is reachable."""
+    try:
+        from database import connect
+        db = connect()
+        return {name: db[name].estimated_document_count()
+                for name in ('scrapped_items', 'live_searches', 'price_daily', 'users', 'alerts')}
+    except Exception as e:
+        print(f"⚠️ Could not read collection sizes: {e}")
+        return {}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concurrent load benchmark for the read-path routes.")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--routes", default=",".join(ROUTES), help=f"comma list of {', '.join(ROUTES)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per route and concurrency")
+    parser.add_argument("--users", type=int, default=1000, help="seeded users to log in as for /profile")
+    parser.add_argument("--password", default="password", help="the password given to seed.py")
+    parser.add_argument("--json", help="also write the results to this file")
+    opts = parser.parse_args()
+
+    sizes = data_sizes()
+    if sizes:
+        print("📦 " + ", ".join(f"{name} {count:,}" for name, count in sizes.items()))
+
+    results = []
+    print(f"\n{'route':<16} {'conc':>4} {'reqs':>7} {'errs':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route in [r.strip() for r in opts.routes.split(",") if r.strip()]:
+        for concurrency in [int(c) for c in opts.concurrency.split(",") if c.strip()]:
+            r = run_route(opts.url.rstrip("/"), route, concurrency, opts.duration, opts.users, opts.password)
+            results.append(r)
+            print(f"{r['route']:<16} {r['concurrency']:>4} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8} "
+                  f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+
+    if opts.json:
+        Path(opts.json).write_text(json.dumps({'sizes': sizes, 'results': results}, indent=2))
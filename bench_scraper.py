@@ -0,0 +1,397 @@
+"""Offline benchmark for the scrape pipeline.
+
+Replays supermarket search pages from local HTTP servers (recorded pages, or synthetic ones),
+answers Gemini prompts with a deterministic stub of configurable latency and writes to an
+in-memory (mongomock) or local Mongo. Each concurrency setting runs in a fresh process and
+reports pages/sec, p50/p95 per stage and peak RSS.
+
+    python bench_scraper.py --concurrency 1,2,4,8 --items 20 --llm-latency 0.8
+    python bench_scraper.py --mode item --pages bench_pages --mongo-uri mongodb://localhost:27017/
+    python bench_scraper.py --record bench_pages      # save real pages once (needs Chrome + network)
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+from urllib.request import urlopen
+
+# --- WORKLOAD ---
+PRODUCTS = ["Sugar", "Maize Meal", "Wheat Flour", "Rice", "Cooking Oil", "Fresh Milk",
+            "Table Salt", "White Bread", "Tea Leaves", "Washing Powder"]
+SIZES = ["500g", "1kg", "2kg", "5kg"]
+BRANDS = ["Kabras", "Jogoo", "Pembe", "Soko", "Mumias", "Tuzo"]
+
+def bench_terms(count):
+    terms = [f"{product} {size}" for size in SIZES for product in PRODUCTS]
+    return terms[:count]
+
+def _bucket(*parts):
+    """Deterministic number in [0, 1) for the given parts."""
+    digest = hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) / 0x100000000
+
+# --- FIXTURE PAGES ---
+# Synthetic pages use the markup each source's tile parser expects; a share of them is
+# deliberately unparseable (forcing the LLM path) and a share is a "no results" page.
+def _tile(source, name, price, parseable):
+    if not parseable:
+        wrapper = {'Jumia': '<article class="prd">{}</article>',
+                   'Carrefour': '<div data-testid="product_card">{}</div>'}.get(source, '<div class="product-card">{}</div>')
+        return wrapper.format(f"<p>{name} now KSh {price:,}</p>")
+    if source == 'Jumia':
+        return f'<article class="prd"><h3 class="name">{name}</h3><div class="prc">KSh {price:,}</div></article>'
+    if source == 'Carrefour':
+        return (f'<div data-testid="product_card"><h2 data-testid="product_name">{name}</h2>'
+                f'<div data-testid="product_card--price">KES {price:,}.00</div></div>')
+    return f'<div class="product-card"><div class="product-name">{name}</div><span class="price">KSh {price:,}</span></div>'
+
+def synthetic_page(source, term, llm_share, empty_share, tiles=12):
+    roll = _bucket(source, term)
+    if roll < empty_share:
+        return f"<html><body><h1>Search</h1><p>No products found for {term}. There are no results for this search. We couldn't find any results.</p></body></html>"
+    parseable = roll >= empty_share + llm_share
+    body = []
+    for i in range(tiles):
+        brand = BRANDS[i % len(BRANDS)]
+        # Half the tiles match the search, the rest are unrelated promos
+        name = f"{brand} {term}" if i % 2 == 0 else f"{brand} Promo Pack {i}"
+        price = 50 + int(_bucket(source, term, str(i)) * 950)
+        body.append(_tile(source, name, price, parseable))
+    padding = "<p>" + "Delivery in 2 hours. " * 40 + "</p>"
+    return f"<html><body><nav>Home Deals Categories</nav>{padding}<section>{''.join(body)}</section>{padding}</body></html>"
+
+def page_slug(term):
+    return re.sub(r"[^a-z0-9]+", "-", term.lower()).strip("-") or "page"
+
+class FixtureSite:
+    """One local server per source, so per-domain limits and breakers behave as in production."""
+    def __init__(self, source, pages_dir, page_latency, llm_share, empty_share):
+        self.source = source
+        recorded = Path(pages_dir) / source if pages_dir else None
+        self.recorded = sorted(recorded.glob("*.html")) if recorded and recorded.is_dir() else []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                term = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+                if page_latency:
+                    time.sleep(page_latency)
+                body = site.page(term, llm_share, empty_share).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search?q={{query}}"
+
+    def page(self, term, llm_share, empty_share):
+        if self.recorded:
+            exact = [p for p in self.recorded if p.stem == page_slug(term)]
+            chosen = exact[0] if exact else self.recorded[int(_bucket(self.source, term) * len(self.recorded))]
+            return chosen.read_text(encoding="utf-8")
+        return synthetic_page(self.source, term, llm_share, empty_share)
+
+# --- FIXTURE BROWSER ---
+# Stands in for headless Chrome: loads the page over HTTP and answers the handful of
+# WebDriver calls the scraper makes (find_elements, page text, pool housekeeping).
+def _fixture_classes():
+    from bs4 import BeautifulSoup
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.remote.webelement import WebElement
+
+    def find(node, by, value):
+        if by == By.TAG_NAME:
+            return node.find_all(value)
+        if by == By.CSS_SELECTOR:
+            return node.select(value)
+        raise NotImplementedError(by)
+
+    class FixtureElement(WebElement):
+        # A WebElement subclass so extractors.BrowserPage treats it like a real element
+        def __init__(self, node):
+            self.node = node
+
+        @property
+        def text(self):
+            return self.node.get_text(" ", strip=True)
+
+        def find_elements(self, by=By.ID, value=None):
+            return [FixtureElement(n) for n in find(self.node, by, value)]
+
+    class FixtureDriver:
+        def __init__(self):
+            self.current_url = "about:blank"
+            self.window_handles = ["main"]
+            self.switch_to = SimpleNamespace(window=lambda handle: None)
+            self._soup = BeautifulSoup("<html><body></body></html>", "html.parser")
+
+        def get(self, url):
+            self.current_url = url
+            if url.startswith("http"):
+                with urlopen(url, timeout=30) as response:
+                    self._soup = BeautifulSoup(response.read(), "html.parser")
+            else:
+                self._soup = BeautifulSoup("<html><body></body></html>", "html.parser")
+
+        def find_elements(self, by=By.ID, value=None):
+            return [FixtureElement(n) for n in find(self._soup, by, value)]
+
+        def find_element(self, by=By.ID, value=None):
+            found = self.find_elements(by, value)
+            if not found:
+                raise LookupError(f"No element for {value}")
+            return found[0]
+
+        def set_page_load_timeout(self, seconds):
+            pass
+
+        def delete_all_cookies(self):
+            pass
+
+        def close(self):
+            pass
+
+        def quit(self):
+            pass
+
+    return FixtureDriver
+
+# --- STUB LLM ---
+SINGLE_PROMPT = re.compile(r'I have text from the (.+?) website search results for "(.*?)"')
+BATCH_SECTION = re.compile(r'### SECTION (\S+)\nSupermarket: (.+)\nSearch: "(.*)"')
+
+class StubModel:
+    """Deterministic stand-in for the Gemini model: sleeps `latency` seconds per call and
+    answers every prompt (single or batched) with a few plausible items."""
+    def __init__(self, latency):
+        self.latency = latency
+
+    @staticmethod
+    def _items(source, term):
+        return [{
+            'product_name': f"{brand} {term}",
+            'price': 50 + int(_bucket(source, term, brand) * 950),
+            'description': 'stub',
+            'unit': term.split()[-1],
+            'location': source,
+        } for brand in BRANDS[:3]]
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.latency)
+        sections = BATCH_SECTION.findall(prompt)
+        if sections:
+            data = {'results': [{'id': sid, 'items': self._items(source.strip(), term)} for sid, source, term in sections]}
+        else:
+            match = SINGLE_PROMPT.search(prompt)
+            source, term = match.groups() if match else ('', '')
+            data = {'items': self._items(source, term)}
+        text = json.dumps(data)
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+# --- ONE RUN ---
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def open_db(mongo_uri):
+    if mongo_uri:
+        from pymongo import MongoClient
+        db = MongoClient(mongo_uri).get_database("chakula_bench")
+        for name in db.list_collection_names():
+            db.drop_collection(name)
+        from indexes import ensure_indexes
+        ensure_indexes(db)
+        return db
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("❌ Install mongomock for an in-memory database, or pass --mongo-uri")
+    return mongomock.MongoClient().get_database("chakula_bench")
+
+def run_once(opts, concurrency):
+    """Runs the workload once in this process. The caller sets the concurrency env vars first."""
+    import driver_pool
+    import metrics
+    import scraper
+
+    samples = {}
+    lock = threading.Lock()
+
+    def collect(value, labels):
+        with lock:
+            samples.setdefault(labels.get('stage', ''), []).append(value)
+    metrics.STAGE_SECONDS.listen(collect)
+
+    sites = {source: FixtureSite(source, opts.pages, opts.page_latency, opts.llm_share, opts.empty_share)
+             for source in scraper.SOURCES}
+    for source, site in sites.items():
+        scraper.SOURCES[source]['url'] = site.url
+    if opts.browser == 'fixture':
+        driver_pool.new_driver = _fixture_classes()
+    scraper.model = StubModel(opts.llm_latency)
+
+    # Whole (term, source) tasks, measured from the outside
+    scrape_task = scraper._scrape_task
+    def timed_task(db, search_term, source, *args, **kwargs):
+        with metrics.timed("task", source):
+            return scrape_task(db, search_term, source, *args, **kwargs)
+    scraper._scrape_task = timed_task
+
+    db = open_db(opts.mongo_uri)
+    terms = bench_terms(opts.items)
+    pages = 0
+    started = time.perf_counter()
+    for _ in range(opts.rounds):
+        if opts.mode == 'dashboard':
+            scraper.COMMODITIES = [{'name': term, 'category': 'Food'} for term in terms]
+            scraper.scrape_real_data(db)
+        elif opts.mode == 'item':
+            with ThreadPoolExecutor(max_workers=opts.clients) as clients:
+                list(clients.map(lambda term: scraper.scrape_single_item(db, term, deadline=None), terms))
+        else:
+            pool = scraper.get_pool()
+            for term in terms:
+                for source, spec in scraper.SOURCES.items():
+                    with pool.driver() as driver:
+                        scraper.process_site_search(driver, db, term, source, spec['url'])
+        pages += len(terms) * len(scraper.SOURCES)
+    elapsed = time.perf_counter() - started
+    scraper.get_pool().close()
+
+    llm_calls = sum(metrics.LLM_CALLS._values.values())
+    return {
+        'concurrency': concurrency,
+        'pages': pages,
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(pages / elapsed, 2) if elapsed else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'llm_calls': int(llm_calls),
+        'records': db.scrapped_items.count_documents({}) + db.live_searches.count_documents({}),
+        'stages': {
+            stage: {'count': len(values), 'p50': round(percentile(values, 50), 4), 'p95': round(percentile(values, 95), 4)}
+            for stage, values in sorted(samples.items())
+        },
+    }
+
+def _child(opts, concurrency, results):
+    with contextlib.ExitStack() as stack:
+        if not opts.verbose:
+            stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+        try:
+            results.put(run_once(opts, concurrency))
+        except Exception as e:
+            results.put({'concurrency': concurrency, 'error': repr(e)})
+
+def run_setting(opts, concurrency):
+    """Runs one concurrency setting in a fresh interpreter so module state and peak RSS start clean."""
+    os.environ["SCRAPE_CONCURRENCY"] = str(concurrency)
+    os.environ["DRIVER_POOL_SIZE"] = str(concurrency)
+    if opts.per_domain:
+        os.environ["SCRAPE_PER_DOMAIN"] = str(opts.per_domain)
+    os.environ.setdefault("BREAKER_FAILURES", "1000")  # local servers never deserve a cooldown
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    child = ctx.Process(target=_child, args=(opts, concurrency, results))
+    child.start()
+    result = results.get()
+    child.join()
+    return result
+
+# --- RECORDING ---
+def record(pages_dir, items):
+    """Saves real search pages for later replay (needs Chrome and network access)."""
+    from scraper import SOURCES, build_search_url, get_driver, wait_for_results
+    driver = get_driver()
+    try:
+        for term in bench_terms(items):
+            for source, spec in SOURCES.items():
+                target = Path(pages_dir) / source / f"{page_slug(term)}.html"
+                target.parent.mkdir(parents=True, exist_ok=True)
+                driver.get(build_search_url(term, source, spec['url']))
+                wait_for_results(driver, source)
+                target.write_text(driver.page_source, encoding="utf-8")
+                print(f"💾 Saved {target}")
+    finally:
+        driver.quit()
+
+# --- REPORT ---
+def print_report(results):
+    print(f"\n{'conc':>4} {'pages':>6} {'secs':>8} {'pages/s':>8} {'rss MB':>8} {'llm':>5} {'records':>8}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['concurrency']:>4} failed: {r['error']}")
+            continue
+        print(f"{r['concurrency']:>4} {r['pages']:>6} {r['seconds']:>8} {r['pages_per_sec']:>8} "
+              f"{r['peak_rss_mb']:>8} {r['llm_calls']:>5} {r['records']:>8}")
+
+    for r in results:
+        if 'error' in r:
+            continue
+        print(f"\nconcurrency {r['concurrency']}: stage latency (seconds)")
+        print(f"  {'stage':<14} {'count':>6} {'p50':>8} {'p95':>8}")
+        for stage, s in r['stages'].items():
+            print(f"  {stage:<14} {s['count']:>6} {s['p50']:>8} {s['p95']:>8}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline scrape pipeline benchmark.")
+    parser.add_argument("--mode", choices=["dashboard", "item", "site"], default="dashboard",
+                        help="scrape_real_data, concurrent scrape_single_item calls, or sequential process_site_search")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="comma-separated SCRAPE_CONCURRENCY values")
+    parser.add_argument("--per-domain", type=int, help="SCRAPE_PER_DOMAIN for every run (default: env)")
+    parser.add_argument("--items", type=int, default=12, help=f"search terms per round (max {len(PRODUCTS) * len(SIZES)})")
+    parser.add_argument("--rounds", type=int, default=1, help="replay the workload this many times (later rounds hit caches)")
+    parser.add_argument("--clients", type=int, default=4, help="parallel live searches in item mode")
+    parser.add_argument("--pages", help="directory of recorded pages: <dir>/<Source>/<term-slug>.html")
+    parser.add_argument("--page-latency", type=float, default=0.2, help="seconds each fixture page takes to serve")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per stub Gemini call")
+    parser.add_argument("--llm-share", type=float, default=0.3, help="share of synthetic pages the parsers can't read")
+    parser.add_argument("--empty-share", type=float, default=0.1, help="share of synthetic 'no results' pages")
+    parser.add_argument("--browser", choices=["fixture", "chrome"], default="fixture",
+                        help="fixture driver, or real headless Chrome against the local pages")
+    parser.add_argument("--mongo-uri", default=os.environ.get("BENCH_MONGO_URI"),
+                        help="local Mongo to use (database chakula_bench is wiped); default in-memory mongomock")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--record", metavar="DIR", help="save real search pages to DIR and exit")
+    parser.add_argument("--verbose", action="store_true", help="show the scraper's own output")
+    opts = parser.parse_args()
+
+    if opts.record:
+        record(opts.record, opts.items)
+        sys.exit(0)
+
+    results = []
+    for concurrency in [int(c) for c in opts.concurrency.split(",") if c.strip()]:
+        print(f"⏱️ {opts.mode}: {opts.items} terms x {opts.rounds} round(s) at concurrency {concurrency}...")
+        results.append(run_setting(opts, concurrency))
+    print_report(results)
+
+    if opts.json:
+        Path(opts.json).write_text(json.dumps(results, indent=2))
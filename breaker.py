@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+# --- CIRCUIT BREAKER ---
+# After FAILURE_THRESHOLD consecutive failures a site is skipped for COOLDOWN_SECONDS.
+# Then one trial request is let through: success closes the breaker, failure reopens it.
+FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURES", 3))
+COOLDOWN_SECONDS = float(os.environ.get("BREAKER_COOLDOWN_SECONDS", 120))
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            # After the cooldown let one trial through; if that trial never reports back,
+            # another one is allowed a cooldown later
+            if now - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self.opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"🔌 Circuit open for {self.name}: skipping it for {self.cooldown:.0f}s")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def breaker_for(url):
+    """One breaker per domain, shared by every scrape in the process."""
+    domain = urlparse(url).netloc
+    with _breakers_lock:
+        if domain not in _breakers:
+            _breakers[domain] = CircuitBreaker(domain)
+        return _breakers[domain]
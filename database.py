@@ -0,0 +1,22 @@
+import os
+from pymongo import MongoClient
+from dotenv import load_dotenv
+from pathlib import Path
+
+env_path = Path(__file__).parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+def connect():
+    """New client for this process (forked workers must not share the parent's)."""
+    client = MongoClient(os.environ.get("MONGO_URI"))
+    return client.get_default_database('chakula_db')
+
+# $dateTrunc (daily rollups, chart buckets) needs MongoDB 5.0
+MIN_SERVER_VERSION = (5, 0)
+
+def check_server_version(db):
+    """Fails early, with a clear message, on a server too old for the queries we run."""
+    version = db.client.server_info()['version']
+    if tuple(int(part) for part in version.split('.')[:2]) < MIN_SERVER_VERSION:
+        required = '.'.join(map(str, MIN_SERVER_VERSION))
+        raise RuntimeError(f"MongoDB {version} is too old: {required} or newer is required")
@@ -0,0 +1,174 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+from metrics import timed
+
+# --- CONFIGURATION ---
+POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", 4))
+MAX_PAGES_PER_DRIVER = int(os.environ.get("DRIVER_MAX_PAGES", 50))
+CHECKOUT_TIMEOUT = int(os.environ.get("DRIVER_CHECKOUT_TIMEOUT", 120))
+PAGE_LOAD_TIMEOUT = int(os.environ.get("DRIVER_PAGE_LOAD_TIMEOUT", 20))
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36"
+
+@lru_cache(maxsize=1)
+def chromedriver_path():
+    """Resolves the chromedriver binary once per process (CHROMEDRIVER_PATH skips the download check)."""
+    return os.environ.get("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
+
+def new_driver():
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    service = Service(chromedriver_path())
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # A hung site must fail the fetch rather than block the browser forever
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    return driver
+
+class PooledDriver:
+    """A browser plus the number of pages it has served."""
+    def __init__(self):
+        with timed("driver_start"):
+            self.driver = new_driver()
+        self.pages = 0
+
+    def is_healthy(self):
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def reset(self):
+        """Clears cookies and extra tabs so the next user starts clean."""
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+        self.driver.delete_all_cookies()
+        self.driver.get("about:blank")
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+class DriverPool:
+    """Long-lived pool of headless Chrome instances, created lazily up to `size`."""
+    def __init__(self, size=POOL_SIZE, max_pages=MAX_PAGES_PER_DRIVER):
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+
+            if create:
+                try:
+                    return PooledDriver()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+            # Poll so a slot freed by a discarded browser is noticed too
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("No browser available in the driver pool")
+            try:
+                return self._idle.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+
+    def _discard(self, pooled):
+        pooled.quit()
+        with self._lock:
+            self._created -= 1
+
+    def _release(self, pooled, crashed):
+        pooled.pages += 1
+        if self._closed or crashed or pooled.pages >= self.max_pages:
+            self._discard(pooled)
+            return
+        try:
+            pooled.reset()
+        except Exception:
+            self._discard(pooled)
+            return
+        self._idle.put(pooled)
+
+    @contextmanager
+    def driver(self, timeout=CHECKOUT_TIMEOUT):
+        """Checks out a healthy driver and returns it to the pool afterwards."""
+        pooled = self._acquire(timeout)
+        while not pooled.is_healthy():
+            self._discard(pooled)
+            pooled = self._acquire(timeout)
+
+        crashed = False
+        try:
+            yield pooled.driver
+        except Exception:
+            crashed = not pooled.is_healthy()
+            raise
+        finally:
+            self._release(pooled, crashed)
+
+    def warm(self, count=None):
+        """Starts browsers ahead of time so the first scrapes don't pay for it."""
+        started = []
+        for _ in range(min(count or self.size, self.size)):
+            try:
+                started.append(self._acquire(timeout=0))
+            except Exception as e:
+                print(f"⚠️ Could not warm browser: {e}")
+                break
+        for pooled in started:
+            self._idle.put(pooled)
+        return len(started)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Process-wide pool shared by all scrapes."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,137 @@
+import re
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+from metrics import FAST_PATH
+from storage import unit_of, UNIT_PATTERN
+
+# --- PAGE WRAPPER ---
+class BrowserPage:
+    """Thin wrapper over a Selenium driver or element so parsers only need select() and text."""
+    def __init__(self, root):
+        self.root = root
+
+    def select(self, css):
+        try:
+            return [BrowserPage(el) for el in self.root.find_elements(By.CSS_SELECTOR, css)]
+        except Exception:
+            return []
+
+    def select_one(self, css):
+        found = self.select(css)
+        return found[0] if found else None
+
+    @property
+    def text(self):
+        if isinstance(self.root, WebElement):
+            return self.root.text or ""
+        return self.root.find_element(By.TAG_NAME, "body").text or ""
+
+def text_of(node, css):
+    """Text of the first element matching any selector in `css`, or ''."""
+    found = node.select_one(css)
+    return found.text.strip() if found else ""
+
+# --- PARSER REGISTRY ---
+# Each parser takes one product tile and returns (product_name, price_text).
+EXTRACTORS = {}
+
+def register(source):
+    def wrap(fn):
+        EXTRACTORS[source] = fn
+        return fn
+    return wrap
+
+@register('Naivas')
+def parse_naivas_tile(tile):
+    name = text_of(tile, "[class*='product-name'], [class*='title'], h3, h2")
+    price = text_of(tile, "[class*='price']")
+    return name, price
+
+@register('Jumia')
+def parse_jumia_tile(tile):
+    return text_of(tile, ".name"), text_of(tile, ".prc")
+
+@register('Carrefour')
+def parse_carrefour_tile(tile):
+    name = text_of(tile, "[data-testid='product_name'], [class*='product-name'], h2, h3")
+    price = text_of(tile, "[data-testid='product_card--price'], [class*='price']")
+    return name, price
+
+# --- FIELD PARSING ---
+PRICE_PATTERN = re.compile(r"(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d{1,2}))?")
+
+def parse_price(text):
+    """First number in a price label like 'KSh 1,299.00'; the old price usually follows it."""
+    match = PRICE_PATTERN.search(text or "")
+    if not match:
+        return 0.0
+    whole = match.group(1).replace(",", "")
+    return float(f"{whole}.{match.group(2) or 0}")
+
+def parse_unit(text):
+    """Quantity in the form search keys use ('1 KGS' -> '1kg'), so units compare across both."""
+    return unit_of(text)
+
+def _words(text):
+    return [w for w in re.findall(r"[a-z]+", UNIT_PATTERN.sub(" ", text.lower())) if len(w) > 1]
+
+def relevance(search_term, product_name):
+    """Share of the search words found in the product name; 0 if the units disagree."""
+    wanted_unit = parse_unit(search_term)
+    if wanted_unit and parse_unit(product_name) != wanted_unit:
+        return 0.0
+    words = _words(search_term)
+    if not words:
+        return 1.0
+    name = product_name.lower()
+    return sum(1 for w in words if w in name) / len(words)
+
+# --- STATS ---
+def _count(source, outcome):
+    FAST_PATH.inc(source=source, outcome=outcome)
+
+# --- EXTRACTION ---
+MIN_RELEVANCE = 0.5
+MAX_ITEMS = 5
+
+def extract_items(source, tiles, search_term):
+    """Parses product tiles without the LLM. Returns {"items": [...]} in ask_gemini's shape,
+    or None when there is no parser or nothing valid came out (caller falls back to the LLM)."""
+    parser = EXTRACTORS.get(source)
+    if parser is None or not tiles:
+        _count(source, 'fallback')
+        return None
+
+    scored = []
+    try:
+        for tile in tiles:
+            name, price_text = parser(tile)
+            price = parse_price(price_text)
+            if not name or not (0 < price < 1_000_000):
+                continue
+            score = relevance(search_term, name)
+            if score >= MIN_RELEVANCE:
+                scored.append((score, {
+                    'product_name': name,
+                    'price': price,
+                    'description': '',
+                    'unit': parse_unit(name) or 'Unit',
+                    'location': source,
+                }))
+    except Exception as e:
+        print(f"⚠️ {source} parser failed: {e}")
+        _count(source, 'errors')
+        return None
+
+    if not scored:
+        _count(source, 'fallback')
+        return None
+
+    # Stable sort keeps the site's own ranking among equally relevant tiles
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    _count(source, 'parsed')
+    return {"items": [item for _, item in scored[:MAX_ITEMS]]}
+
+def tile_text(tiles, limit=25000):
+    """Product-tile text only, for the LLM fallback."""
+    return "\n---\n".join(t.text for t in tiles if t.text)[:limit]
@@ -0,0 +1,69 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+from driver_pool import USER_AGENT
+from metrics import FETCH_TIER
+
+# --- HTTP TIER ---
+# Sources whose search results are server-rendered are fetched with one shared keep-alive
+# session instead of a headless browser. Connections are pooled per host and capped, and
+# responses are compressed on the wire.
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 10))
+HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", 10))
+HTTP_PER_HOST = int(os.environ.get("HTTP_PER_HOST", 4))
+
+def _new_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_HOSTS,
+        pool_maxsize=HTTP_PER_HOST,
+        pool_block=True,  # wait for a free connection rather than opening extra ones
+        max_retries=Retry(total=1, backoff_factor=0.5, status_forcelist=[502, 503, 504]),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8",
+        "Accept-Encoding": "gzip, deflate",
+        "Accept-Language": "en-KE,en;q=0.9",
+    })
+    return session
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _new_session()
+        return _session
+
+class HtmlPage:
+    """BeautifulSoup counterpart of extractors.BrowserPage: select(), select_one() and text."""
+    def __init__(self, node):
+        self.node = node
+
+    def select(self, css):
+        return [HtmlPage(el) for el in self.node.select(css)]
+
+    def select_one(self, css):
+        found = self.node.select_one(css)
+        return HtmlPage(found) if found is not None else None
+
+    @property
+    def text(self):
+        return self.node.get_text(" ", strip=True)
+
+def fetch_html(url):
+    response = get_session().get(url, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return HtmlPage(BeautifulSoup(response.text, "html.parser"))
+
+def count_tier(source, tier):
+    """Which tier served a page: 'http', 'browser', or 'http_fallback' (tried HTTP, needed the browser)."""
+    FETCH_TIER.inc(source=source, tier=tier)
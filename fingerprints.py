@@ -0,0 +1,51 @@
+import hashlib
+import re
+from datetime import datetime
+from storage import normalize_term, day_of
+
+# --- PAGE FINGERPRINTS ---
+# db.page_fingerprints remembers, per (collection, source, search term), a hash of the
+# product-tile text and the items extracted from it. If the next scrape sees the same
+# hash, extraction is skipped: on the same day only seen_at is bumped, on a new day the
+# remembered items are written again so the history has no gaps.
+def fingerprint(text):
+    normalized = re.sub(r"\s+", " ", text or "").strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def _key(collection_name, source, search_term):
+    search_key = normalize_term(search_term)
+    return f"{collection_name}:{source}:{search_key}", search_key
+
+def previous(db, collection_name, source, search_term, page_hash):
+    """The remembered page if its hash matches, else None."""
+    key, _ = _key(collection_name, source, search_term)
+    return db.page_fingerprints.find_one({"_id": key, "hash": page_hash})
+
+def remember(db, collection_name, source, search_term, page_hash, items):
+    key, search_key = _key(collection_name, source, search_term)
+    now = datetime.utcnow()
+    db.page_fingerprints.update_one(
+        {"_id": key},
+        {"$set": {
+            "collection": collection_name,
+            "source": source,
+            "search_key": search_key,
+            "hash": page_hash,
+            "items": items,
+            "seen_at": now,
+            "written_day": day_of(now),
+        }},
+        upsert=True
+    )
+
+def heartbeat(db, collection_name, source, search_term):
+    key, _ = _key(collection_name, source, search_term)
+    db.page_fingerprints.update_one({"_id": key}, {"$set": {"seen_at": datetime.utcnow()}})
+
+def last_seen(db, collection_name, search_term):
+    """{source: seen_at} for pages last confirmed unchanged or written."""
+    rows = db.page_fingerprints.find(
+        {"collection": collection_name, "search_key": normalize_term(search_term)},
+        {"source": 1, "seen_at": 1}
+    )
+    return {row['source']: row['seen_at'] for row in rows}
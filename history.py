@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+# --- CHART SERIES ---
+# Price history is bucketed in Mongo ($dateTrunc over the daily rollups) so only one point
+# per source per bucket ever reaches Python, and the bucket is widened until the chart fits
+# in MAX_POINTS.
+MAX_POINTS = 90
+BUCKETS = {'day': timedelta(days=1), 'week': timedelta(weeks=1), 'month': timedelta(days=30)}
+LABEL_FORMATS = {'day': '%Y-%m-%d', 'week': '%Y-%m-%d', 'month': '%Y-%m'}
+COLORS = {'Naivas': '#ef4444', 'Jumia': '#f97316', 'Carrefour': '#3b82f6'}
+FALLBACK_COLORS = ['#10b981', '#8b5cf6', '#eab308', '#ec4899', '#64748b']
+
+def parse_range(args):
+    """Reads from/to (YYYY-MM-DD) and bucket from request args; bad values are ignored."""
+    def parse(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d') if value else None
+        except ValueError:
+            return None
+    start = parse(args.get('from'))
+    end = parse(args.get('to'))
+    if end:
+        end += timedelta(days=1)  # inclusive of the whole 'to' day
+    bucket = args.get('bucket')
+    return start, end, bucket if bucket in BUCKETS else 'day'
+
+def choose_bucket(start, end, requested='day'):
+    """The requested bucket, widened until the range fits in MAX_POINTS."""
+    names = list(BUCKETS)
+    for name in names[names.index(requested):]:
+        if (end - start) / BUCKETS[name] <= MAX_POINTS:
+            return name
+    return names[-1]
+
+def color_for(source, index):
+    return COLORS.get(source, FALLBACK_COLORS[index % len(FALLBACK_COLORS)])
+
+def _day_match(collection, commodity, start, end):
+    """`commodity` is one name or a list of names stored for the same product."""
+    if not isinstance(commodity, str):
+        commodity = {"$in": list(commodity)}
+    match = {"collection": collection, "commodity": commodity}
+    if start or end:
+        match['day'] = {}
+        if start:
+            match['day']['$gte'] = start
+        if end:
+            match['day']['$lt'] = end
+    return match
+
+def price_series(db, collection, commodity, start=None, end=None, bucket='day'):
+    """Chart.js {'labels', 'datasets'}: latest price per source per time bucket, read from
+    the daily rollups (see rollups.py) rather than raw observations."""
+    end = end or datetime.utcnow()
+    if start is None:
+        first = db.price_daily.find_one(_day_match(collection, commodity, None, end), {"day": 1}, sort=[("day", 1)])
+        if not first:
+            return {'labels': [], 'datasets': []}
+        start = first['day']
+
+    bucket = choose_bucket(start, end, bucket)
+    # Even the widest bucket can't fit: keep the most recent MAX_POINTS buckets
+    start = max(start, end - BUCKETS[bucket] * MAX_POINTS)
+
+    pipeline = [
+        {"$match": _day_match(collection, commodity, start, end)},
+        {"$sort": {"day": 1}},
+        {"$group": {
+            "_id": {"bucket": {"$dateTrunc": {"date": "$day", "unit": bucket}}, "source": "$source"},
+            "price": {"$last": "$last"},
+        }},
+    ]
+    rows = list(db.price_daily.aggregate(pipeline))
+    return build_series(rows, bucket)
+
+def build_series(rows, bucket):
+    """Turns [{'_id': {'bucket', 'source'}, 'price'}] rows into Chart.js data."""
+    buckets = sorted({r['_id']['bucket'] for r in rows})
+    sources = sorted({r['_id']['source'] for r in rows})
+    prices = {(r['_id']['bucket'], r['_id']['source']): r['price'] for r in rows}
+
+    datasets = []
+    for i, source in enumerate(sources):
+        color = color_for(source, i)
+        datasets.append({
+            'label': source,
+            'data': [prices.get((b, source)) for b in buckets],
+            'borderColor': color, 'backgroundColor': color,
+            'fill': False, 'tension': 0.1
+        })
+    fmt = LABEL_FORMATS[bucket]
+    return {'labels': [b.strftime(fmt) for b in buckets], 'datasets': datasets}
+
+def latest_by_source(db, collection, match):
+    """Most recent record per source."""
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"created_at": -1}},
+        {"$group": {"_id": "$source", "doc": {"$first": "$$ROOT"}}},
+        {"$replaceRoot": {"newRoot": "$doc"}},
+        {"$sort": {"source": 1}},
+    ]
+    return list(db[collection].aggregate(pipeline))
+
+def recent_records(db, collection, match, limit=15):
+    """Last `limit` observations, oldest first, with only the fields the UI shows."""
+    rows = list(db[collection].find(
+        match,
+        {"_id": 0, "source": 1, "price": 1, "product_name": 1, "created_at": 1},
+        sort=[("created_at", -1)],
+        limit=limit
+    ))
+    return rows[::-1]
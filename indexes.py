@@ -0,0 +1,158 @@
+import sys
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from storage import RECORD_KEY
+
+# One row per RECORD_KEY, so concurrent writers' upserts can't insert the same day twice.
+# Rows stored before RecordWriter set `day` are left out.
+RECORD_KEY_OPTIONS = {"unique": True, "partialFilterExpression": {"day": {"$exists": True}}}
+
+# --- INDEX DECLARATIONS ---
+# collection -> list of (keys, options). create_index is a no-op when an identical index exists.
+INDEXES = {
+    'users': [
+        ([("email", ASCENDING)], {"unique": True}),
+    ],
+    'scrapped_items': [
+        ([("commodity_name", ASCENDING), ("created_at", ASCENDING)], {}),
+        ([(field, ASCENDING) for field in RECORD_KEY], RECORD_KEY_OPTIONS),
+        ([("created_at", ASCENDING)], {}),  # retention.py
+    ],
+    'live_searches': [
+        ([("search_key", ASCENDING), ("created_at", ASCENDING)], {}),
+        ([(field, ASCENDING) for field in RECORD_KEY], RECORD_KEY_OPTIONS),
+        ([("created_at", ASCENDING)], {}),  # retention.py
+    ],
+    'alerts': [
+        ([("user_id", ASCENDING), ("active", ASCENDING)], {}),
+        ([("user_id", ASCENDING), ("item_name", ASCENDING)], {}),
+        ([("active", ASCENDING)], {}),
+    ],
+    'notifications': [
+        ([("alert_id", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING), ("created_at", DESCENDING)], {}),
+    ],
+    'inventory': [
+        ([("user_id", ASCENDING), ("date_added", DESCENDING)], {}),
+    ],
+    'price_daily': [
+        ([("collection", ASCENDING), ("commodity", ASCENDING), ("day", ASCENDING)], {}),
+        ([("collection", ASCENDING), ("category", ASCENDING), ("min", ASCENDING)], {}),
+    ],
+    'page_fingerprints': [
+        ([("collection", ASCENDING), ("search_key", ASCENDING)], {}),
+    ],
+    'search_terms': [
+        ([("updated_at", ASCENDING)], {}),
+    ],
+    'scrape_jobs': [
+        ([("active_key", ASCENDING)], {"unique": True, "sparse": True}),
+        ([("status", ASCENDING), ("created_at", ASCENDING)], {}),
+    ],
+    'llm_cache': [
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+}
+
+# Indexes earlier versions created that no query uses any more; dropped on startup
+OBSOLETE_INDEXES = {
+    'scrapped_items': [[("category", ASCENDING), ("price", ASCENDING)]],  # dashboard reads price_daily
+    'live_searches': [[("search_term", ASCENDING), ("created_at", ASCENDING)]],  # search uses search_key
+}
+
+# --- QUERY PLAN CHECKS ---
+# The filter/sort shape of each route's query, with sample values.
+QUERY_CHECKS = [
+    ("login/register", 'users', {"email": "someone@example.com"}, None),
+    ("category_dashboard", 'price_daily', {"collection": "scrapped_items", "category": "Food"}, [("min", 1)]),
+    ("price charts", 'price_daily', {"collection": "scrapped_items", "commodity": "Sugar 1kg"}, [("day", 1)]),
+    ("get_item_details", 'scrapped_items', {"commodity_name": {"$in": ["Sugar 1kg", "Sugar 1 Kg"]}}, [("created_at", -1)]),
+    ("search index refresh", 'search_terms', {"updated_at": {"$gte": datetime(2024, 1, 1)}}, None),
+    ("search_results", 'live_searches', {"search_key": "sugar 1kg"}, [("created_at", 1)]),
+    ("profile", 'alerts', {"user_id": "0", "active": True}, None),
+    ("profile notifications", 'notifications', {"user_id": "0"}, [("created_at", -1)]),
+    ("subscribe_alert", 'alerts', {"item_name": "Sugar 1kg", "user_id": "0"}, None),
+    ("inventory", 'inventory', {"user_id": "0"}, [("date_added", -1)]),
+    ("job queue", 'scrape_jobs', {"status": "queued"}, [("created_at", 1)]),
+    ("retention", 'scrapped_items', {"created_at": {"$lt": datetime(2024, 1, 1)}}, [("created_at", 1)]),
+]
+
+def ensure_indexes(db):
+    """Creates every declared index; safe to run on each startup."""
+    for collection, obsolete in OBSOLETE_INDEXES.items():
+        for keys in obsolete:
+            for name, info in db[collection].index_information().items():
+                if [(k, int(v)) for k, v in info['key']] == keys:
+                    print(f"🗂️  Dropping unused index {collection}.{name}")
+                    db[collection].drop_index(name)
+
+    created = 0
+    for collection, specs in INDEXES.items():
+        for keys, options in specs:
+            try:
+                _drop_changed(db[collection], keys, options)
+                try:
+                    db[collection].create_index(keys, **options)
+                except DuplicateKeyError:
+                    if options is not RECORD_KEY_OPTIONS:
+                        raise
+                    print(f"🧹 Removed {remove_duplicate_records(db, collection)} duplicate {collection} rows")
+                    db[collection].create_index(keys, **options)
+                created += 1
+            except Exception as e:
+                print(f"⚠️ Index {collection} {keys} not created: {e}")
+    return created
+
+def _drop_changed(collection, keys, options):
+    """Drops an index on the same keys that was declared without uniqueness (or with it)."""
+    for name, info in collection.index_information().items():
+        if [(k, int(v)) for k, v in info['key']] == keys and bool(info.get('unique')) != bool(options.get('unique')):
+            print(f"🗂️  Replacing index {collection.name}.{name}")
+            collection.drop_index(name)
+
+def remove_duplicate_records(db, collection_name):
+    """Keeps the latest row of every RECORD_KEY that was stored more than once."""
+    pipeline = [
+        {"$match": {"day": {"$exists": True}}},
+        {"$sort": {"created_at": -1}},
+        {"$group": {"_id": {field: f"${field}" for field in RECORD_KEY}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    removed = 0
+    for group in db[collection_name].aggregate(pipeline, allowDiskUse=True):
+        removed += db[collection_name].delete_many({"_id": {"$in": group['ids'][1:]}}).deleted_count
+    return removed
+
+def _plan_stages(plan):
+    """Yields every stage name in an explain() plan tree."""
+    if not isinstance(plan, dict):
+        return
+    if 'stage' in plan:
+        yield plan['stage']
+    for key in ('inputStage', 'queryPlan'):
+        yield from _plan_stages(plan.get(key))
+    for child in plan.get('inputStages', []):
+        yield from _plan_stages(child)
+
+def check_query_plans(db):
+    """Explains every route query. Returns the names of those that fall back to COLLSCAN."""
+    failures = []
+    for name, collection, query, sort in QUERY_CHECKS:
+        command = {"find": collection, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        explained = db.command("explain", command, verbosity="queryPlanner")
+        stages = list(_plan_stages(explained['queryPlanner']['winningPlan']))
+        ok = 'COLLSCAN' not in stages
+        print(f"{'✅' if ok else '❌'} {name}: {' <- '.join(stages)}")
+        if not ok:
+            failures.append(name)
+    return failures
+
+if __name__ == '__main__':
+    from database import connect
+    db = connect()
+    print(f"🗂️  Ensured {ensure_indexes(db)} indexes")
+    if '--check' in sys.argv:
+        sys.exit(1 if check_query_plans(db) else 0)
@@ -0,0 +1,117 @@
+import json
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# --- JOB QUEUE ---
+# Scrape jobs live in db.scrape_jobs and move queued -> running -> done | failed.
+# While a job is queued or running it holds `active_key`, which is unique, so
+# enqueueing an identical job returns the one already pending.
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+# A running job whose worker hasn't reported progress for this long is requeued
+STALE_AFTER = timedelta(minutes=10)
+
+def job_key(kind, params):
+    return f"{kind}:{json.dumps(params, sort_keys=True)}"
+
+def enqueue(db, kind, params=None, key=None):
+    """Queues a scrape and returns its job id (an existing one if identical work is pending).
+    `key` overrides what counts as identical; by default it is the kind plus params."""
+    params = params or {}
+    key = key or job_key(kind, params)
+    now = datetime.utcnow()
+    try:
+        return db.scrape_jobs.insert_one({
+            "kind": kind,
+            "params": params,
+            "status": QUEUED,
+            "active_key": key,
+            "progress": {"done": 0, "total": 0},
+            "created_at": now,
+            "updated_at": now,
+        }).inserted_id
+    except DuplicateKeyError:
+        existing = db.scrape_jobs.find_one({"active_key": key}, {"_id": 1})
+        if existing:
+            return existing['_id']
+        # It finished between our insert and lookup; queue a fresh one
+        return enqueue(db, kind, params, key)
+
+def add_targets(db, job_id, targets):
+    """Adds sources to a live-search job that hasn't started yet. False if it already has."""
+    return db.scrape_jobs.update_one(
+        {"_id": job_id, "status": QUEUED},
+        {"$addToSet": {"params.targets": {"$each": list(targets)}}, "$set": {"updated_at": datetime.utcnow()}}
+    ).matched_count == 1
+
+def claim(db, worker_id):
+    """Atomically takes the oldest queued job, or returns None."""
+    now = datetime.utcnow()
+    return db.scrape_jobs.find_one_and_update(
+        {"status": QUEUED},
+        {"$set": {"status": RUNNING, "worker": worker_id, "started_at": now, "updated_at": now}},
+        sort=[("created_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def report_progress(db, job_id, done, total):
+    db.scrape_jobs.update_one(
+        {"_id": job_id},
+        {"$set": {"progress": {"done": done, "total": total}, "updated_at": datetime.utcnow()}}
+    )
+
+def report_source(db, job_id, source, found):
+    """Marks one source of a live-search job as finished (possibly after the job itself)."""
+    now = datetime.utcnow()
+    db.scrape_jobs.update_one(
+        {"_id": job_id},
+        {"$set": {f"sources.{source}": {"found": found, "at": now}, "updated_at": now}}
+    )
+
+def finish(db, job_id, result):
+    now = datetime.utcnow()
+    db.scrape_jobs.update_one(
+        {"_id": job_id},
+        {"$set": {"status": DONE, "result": result, "finished_at": now, "updated_at": now},
+         "$unset": {"active_key": ""}}
+    )
+
+def fail(db, job_id, error):
+    now = datetime.utcnow()
+    db.scrape_jobs.update_one(
+        {"_id": job_id},
+        {"$set": {"status": FAILED, "error": str(error), "finished_at": now, "updated_at": now},
+         "$unset": {"active_key": ""}}
+    )
+
+def requeue_stale(db):
+    """Puts jobs back in the queue whose worker died mid-run."""
+    cutoff = datetime.utcnow() - STALE_AFTER
+    result = db.scrape_jobs.update_many(
+        {"status": RUNNING, "updated_at": {"$lt": cutoff}},
+        {"$set": {"status": QUEUED, "updated_at": datetime.utcnow()}, "$unset": {"worker": ""}}
+    )
+    return result.modified_count
+
+def get_job(db, job_id):
+    """Job status as a JSON-friendly dict, or None."""
+    try:
+        doc = db.scrape_jobs.find_one({"_id": ObjectId(job_id)})
+    except Exception:
+        return None
+    if not doc:
+        return None
+    return {
+        "id": str(doc['_id']),
+        "kind": doc['kind'],
+        "params": doc.get('params', {}),
+        "status": doc['status'],
+        "progress": doc.get('progress', {}),
+        "sources": {name: s['found'] for name, s in doc.get('sources', {}).items()},
+        "result": doc.get('result'),
+        "error": doc.get('error'),
+        "created_at": doc['created_at'].isoformat(),
+        "finished_at": doc['finished_at'].isoformat() if doc.get('finished_at') else None,
+    }
@@ -0,0 +1,57 @@
+import os
+from datetime import datetime, timedelta
+from storage import normalize_term
+import fingerprints
+import jobs
+
+# --- FRESHNESS ---
+LIVE_SOURCES = ['Naivas', 'Jumia', 'Carrefour']
+
+# Stored live results younger than this are served instead of re-scraping
+DEFAULT_FRESH_MINUTES = float(os.environ.get("LIVE_FRESH_MINUTES", 60))
+FRESH_MINUTES = {
+    # Per-source overrides, e.g. 'Jumia': 30
+}
+
+def fresh_window(source):
+    return timedelta(minutes=FRESH_MINUTES.get(source, DEFAULT_FRESH_MINUTES))
+
+def last_scraped(db, search_term):
+    """When each source last returned results for the term, in one query."""
+    pipeline = [
+        {"$match": {"search_key": normalize_term(search_term)}},
+        {"$group": {"_id": "$source", "last": {"$max": "$created_at"}}},
+    ]
+    return {row['_id']: row['last'] for row in db.live_searches.aggregate(pipeline)}
+
+def stale_sources(db, search_term, sources=None):
+    """Sources whose stored results for the term are missing or older than their freshness window.
+    A page confirmed unchanged (see fingerprints.py) counts as freshly scraped."""
+    sources = sources or LIVE_SOURCES
+    now = datetime.utcnow()
+    last = last_scraped(db, search_term)
+    for source, seen_at in fingerprints.last_seen(db, 'live_searches', search_term).items():
+        if source in last and seen_at > last[source]:
+            last[source] = seen_at
+    return [s for s in sources if s not in last or now - last[s] > fresh_window(s)]
+
+def live_job_key(search_term, targets=None):
+    """Job de-duplication key: one active live search per normalized term, whichever sources
+    each search found stale, so overlapping searches join the pending job instead of scraping
+    the shared sources twice. Within a worker, sources still running after a job's deadline
+    are shared per (term, source) too (see scraper.scrape_single_item). Follow-up jobs for
+    sources a running job doesn't cover are keyed by those sources as well."""
+    key = f"item:{normalize_term(search_term)}"
+    return f"{key}:{','.join(sorted(targets))}" if targets else key
+
+def queue_live_search(db, item_name, targets):
+    """Queues a live search for the stale `targets`, or joins the one pending for the term.
+    A queued job takes on the sources it lacks; a running one can't, so they get a follow-up
+    job. Returns the id of the job covering `targets` (or the part the running one doesn't)."""
+    job_id = jobs.enqueue(db, 'item', {'item_name': item_name, 'targets': targets}, key=live_job_key(item_name))
+    job = db.scrape_jobs.find_one({"_id": job_id}, {"params.targets": 1})
+    missing = [s for s in targets if s not in job['params'].get('targets', [])]
+    if missing and not jobs.add_targets(db, job_id, missing):
+        job_id = jobs.enqueue(db, 'item', {'item_name': item_name, 'targets': missing},
+                              key=live_job_key(item_name, missing))
+    return job_id
@@ -0,0 +1,93 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from metrics import LLM_CACHE
+
+# --- CONFIGURATION ---
+CACHE_TTL_HOURS = float(os.environ.get("LLM_CACHE_TTL_HOURS", 24))
+CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 2000))
+
+def normalize_page_text(page_text):
+    """Collapses whitespace so layout-only differences hash the same."""
+    return re.sub(r"\s+", " ", page_text or "").strip()
+
+def make_key(page_text, search_term, supermarket, prompt_version):
+    raw = "\x1f".join([
+        prompt_version,
+        supermarket,
+        " ".join(search_term.lower().split()),
+        normalize_page_text(page_text),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """Extraction results keyed by page content: an in-memory LRU in front of an
+    optional Mongo collection so entries survive restarts."""
+    def __init__(self, collection=None, ttl_hours=CACHE_TTL_HOURS, max_entries=CACHE_MAX_ENTRIES):
+        self.collection = collection
+        self.ttl = timedelta(hours=ttl_hours)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                LLM_CACHE.inc(result="hit")
+                return entry[1]
+            self._entries.pop(key, None)
+
+        doc = None
+        if self.collection is not None:
+            try:
+                doc = self.collection.find_one({"_id": key, "expires_at": {"$gt": now}})
+            except Exception as e:
+                print(f"⚠️ LLM cache read failed: {e}")
+
+        with self._lock:
+            if doc:
+                self._remember(key, doc['value'], doc['expires_at'])
+                LLM_CACHE.inc(result="hit")
+                return doc['value']
+            LLM_CACHE.inc(result="miss")
+        return None
+
+    def set(self, key, value):
+        expires_at = datetime.utcnow() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+
+        if self.collection is not None:
+            try:
+                # Mongo drops the document once expires_at passes (TTL index)
+                self.collection.replace_one(
+                    {"_id": key},
+                    {"_id": key, "value": value, "expires_at": expires_at},
+                    upsert=True
+                )
+            except Exception as e:
+                print(f"⚠️ LLM cache write failed: {e}")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache(db=None):
+    """Process-wide cache, persisted to db.llm_cache when a database is given."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            # The TTL index on expires_at is declared in indexes.py
+            _cache = LLMCache(db.llm_cache if db is not None else None)
+        return _cache
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- METRICS REGISTRY ---
+# A small in-process registry rendered in the Prometheus text format. Every process keeps
+# its own numbers: the web app serves them on /metrics, workers via start_http_server().
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REGISTRY = []
+_lock = threading.Lock()
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with _lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._listeners = []
+        REGISTRY.append(self)
+
+    def listen(self, fn):
+        """Also passes every raw observation to fn(value, labels), e.g. for exact percentiles."""
+        self._listeners.append(fn)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        for fn in self._listeners:
+            fn(value, labels)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            for key, entry in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, entry['buckets']):
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', '+Inf')])} {entry['count']}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {entry['sum']}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {entry['count']}")
+        return lines
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- METRICS ---
+STAGE_SECONDS = Histogram("scraper_stage_seconds", "Time spent per scrape stage", ("stage", "source"))
+PAGES = Counter("scraper_pages_total", "Result pages by outcome", ("source", "outcome"))
+FETCH_TIER = Counter("scraper_fetch_tier_total", "Which fetch tier served each page", ("source", "tier"))
+FAST_PATH = Counter("scraper_fast_path_total", "Deterministic parser outcomes", ("source", "outcome"))
+LLM_CALLS = Counter("llm_calls_total", "Gemini requests by kind and outcome", ("kind", "outcome"))
+LLM_PROMPT_CHARS = Counter("llm_prompt_chars_total", "Characters of page text sent to Gemini", ("kind",))
+LLM_TOKENS = Counter("llm_tokens_total", "Gemini tokens reported by the API", ("kind", "direction"))
+LLM_CACHE = Counter("llm_cache_requests_total", "Extraction cache lookups", ("result",))
+DB_RECORDS = Counter("db_records_written_total", "Scraped records flushed to Mongo", ("collection",))
+HTTP_SECONDS = Histogram("http_request_seconds", "Flask route latency", ("route", "method", "status"))
+
+# --- STRUCTURED LOGS ---
+logger = logging.getLogger("chakula.metrics")
+
+def log_event(event, **fields):
+    """One JSON line per event, e.g. {"event": "stage", "stage": "llm", "seconds": 1.2}."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": event, **fields}, default=str))
+
+def configure_logging():
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(message)s")
+
+@contextmanager
+def timed(stage, source="", **fields):
+    """Times a block into scraper_stage_seconds and the structured log."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage=stage, source=source)
+        log_event("stage", stage=stage, source=source, seconds=round(seconds, 4), outcome=outcome, **fields)
+
+# --- WORKER EXPORTER ---
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serves /metrics from a background thread (for processes without Flask)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,210 @@
+import argparse
+import gzip
+import os
+import socket
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from bson import json_util
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
+from storage import day_of
+import rollups
+import summaries
+
+# --- RETENTION POLICY ---
+# Raw observations older than raw_days are folded into the daily rollups (db.price_daily,
+# see rollups.py), moved to their archive and deleted, so the price collections only hold
+# recent history while charts keep the long-range trend. Archives:
+#   'collection'  <name>_archive, created with zstd block compression
+#   'jsonl'       gzipped JSON Lines under ARCHIVE_DIR/<name>/<YYYY-MM-DD>.jsonl.gz (mongoimport-able)
+#   'none'        just delete
+RETENTION = {
+    'live_searches': {
+        'raw_days': float(os.environ.get("LIVE_SEARCHES_RAW_DAYS", 30)),
+        'archive': os.environ.get("LIVE_SEARCHES_ARCHIVE", "none"),
+    },
+    'scrapped_items': {
+        'raw_days': float(os.environ.get("SCRAPPED_ITEMS_RAW_DAYS", 180)),
+        'archive': os.environ.get("SCRAPPED_ITEMS_ARCHIVE", "collection"),
+    },
+}
+ARCHIVE_MODES = ('collection', 'jsonl', 'none')
+
+def check_policies():
+    """Fails at import rather than at the first compaction, hours into a worker's life."""
+    for name, policy in RETENTION.items():
+        if policy['archive'] not in ARCHIVE_MODES:
+            raise ValueError(f"Unknown archive mode for {name}: {policy['archive']} (expected one of {', '.join(ARCHIVE_MODES)})")
+
+check_policies()
+
+# Daily rollups older than this are dropped too; 0 keeps them forever
+ROLLUP_DAYS = float(os.environ.get("PRICE_DAILY_DAYS", 0))
+ARCHIVE_DIR = Path(os.environ.get("RETENTION_ARCHIVE_DIR", "archive"))
+INTERVAL_HOURS = float(os.environ.get("RETENTION_INTERVAL_HOURS", 24))  # 0 disables the schedule
+RETRY_AFTER = timedelta(minutes=15)  # a failed run is retried this soon, not a whole interval later
+BATCH_SIZE = 5000
+
+def cutoff_for(policy, now=None):
+    """Start of the oldest day that is kept raw; whole days before it are compacted."""
+    now = now or datetime.utcnow()
+    return day_of(now - timedelta(days=policy['raw_days']))
+
+# --- ARCHIVES ---
+def archive_collection(db, collection_name):
+    name = f"{collection_name}_archive"
+    if name not in db.list_collection_names():
+        try:
+            db.create_collection(name, storageEngine={'wiredTiger': {'configString': 'block_compressor=zstd'}})
+        except CollectionInvalid:
+            pass  # created by another process meanwhile
+        except OperationFailure as e:
+            # Storage engine without zstd (or not WiredTiger): archive uncompressed
+            print(f"⚠️ Creating {name} with zstd failed ({e}); using default storage options")
+            try:
+                db.create_collection(name)
+            except CollectionInvalid:
+                pass
+    return db[name]
+
+def archive_to_collection(db, collection_name, docs):
+    try:
+        archive_collection(db, collection_name).insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # A rerun after a crash between archiving and deleting: those rows are archived already
+        if any(err['code'] != 11000 for err in e.details.get('writeErrors', [])):
+            raise
+
+def archive_to_jsonl(collection_name, docs):
+    by_day = {}
+    for doc in docs:
+        by_day.setdefault(doc['created_at'].strftime('%Y-%m-%d'), []).append(doc)
+    folder = ARCHIVE_DIR / collection_name
+    folder.mkdir(parents=True, exist_ok=True)
+    for day, rows in by_day.items():
+        # Appending adds a new gzip member; readers see one continuous stream
+        with gzip.open(folder / f"{day}.jsonl.gz", "at", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json_util.dumps(row) + "\n")
+
+def archive(db, collection_name, mode, docs):
+    if mode == 'collection':
+        archive_to_collection(db, collection_name, docs)
+    elif mode == 'jsonl':
+        archive_to_jsonl(collection_name, docs)
+    elif mode != 'none':
+        raise ValueError(f"Unknown archive mode for {collection_name}: {mode}")
+
+# --- COMPACTION ---
+def rolled_up_until(db, collection_name):
+    """Start of the first day whose rollups haven't been frozen by compaction yet, or None."""
+    doc = db.retention_runs.find_one({"_id": "rolled_up"}, {collection_name: 1})
+    return doc.get(collection_name) if doc else None
+
+def compact_collection(db, collection_name, policy, dry_run=False):
+    """Rolls up, archives and deletes raw rows older than the policy's cutoff. Returns rows removed."""
+    cutoff = cutoff_for(policy)
+    old = {"created_at": {"$lt": cutoff}}
+    if dry_run:
+        count = db[collection_name].count_documents(old)
+        print(f"🧹 {collection_name}: {count} rows before {cutoff:%Y-%m-%d} would be compacted ({policy['archive']})")
+        return count
+
+    oldest = db[collection_name].find_one(old, {"created_at": 1}, sort=[("created_at", 1)])
+    if not oldest:
+        return 0
+    # Whole days only, so every rolled-up day is complete. Days before the mark were rolled up
+    # by an earlier run that may have died while deleting them; rolling those up again would
+    # replace their rollups with whatever rows are left.
+    start = day_of(oldest['created_at'])
+    mark = rolled_up_until(db, collection_name)
+    if mark:
+        start = max(start, mark)
+    if start < cutoff:
+        rollups.backfill(db, collection_name, start, cutoff)
+    db.retention_runs.update_one({"_id": "rolled_up"}, {"$max": {collection_name: cutoff}}, upsert=True)
+
+    removed = 0
+    while True:
+        docs = list(db[collection_name].find(old, sort=[("created_at", 1)], limit=BATCH_SIZE))
+        if not docs:
+            break
+        archive(db, collection_name, policy['archive'], docs)
+        db[collection_name].delete_many({"_id": {"$in": [d['_id'] for d in docs]}})
+        removed += len(docs)
+        if collection_name == 'scrapped_items':
+            # Keep the home page's per-category counts in line with what is left
+            for category, count in Counter(d.get('category') for d in docs).items():
+                db.category_counts.update_one({"_id": category}, {"$inc": {"count": -count}})
+    if removed and collection_name == 'scrapped_items':
+        summaries.invalidate()
+    print(f"🧹 {collection_name}: compacted {removed} rows before {cutoff:%Y-%m-%d} ({policy['archive']})")
+    return removed
+
+def compact(db, collections=None, dry_run=False):
+    """Applies every retention policy (or just `collections`). Returns {collection: rows removed}."""
+    removed = {}
+    for name, policy in RETENTION.items():
+        if collections and name not in collections:
+            continue
+        removed[name] = compact_collection(db, name, policy, dry_run)
+
+    if ROLLUP_DAYS and not collections:
+        expired = {"day": {"$lt": day_of(datetime.utcnow() - timedelta(days=ROLLUP_DAYS))}}
+        if dry_run:
+            print(f"🧹 price_daily: {db.price_daily.count_documents(expired)} rollups would expire")
+        else:
+            removed['price_daily'] = db.price_daily.delete_many(expired).deleted_count
+    return removed
+
+# --- SCHEDULING ---
+# Workers call run_if_due() between jobs. A lease in db.retention_runs makes sure only one
+# worker in the fleet compacts per interval.
+_next_check = 0.0
+
+def claim_run(db, owner, now=None):
+    now = now or datetime.utcnow()
+    try:
+        return db.retention_runs.find_one_and_update(
+            {"_id": "compaction", "next_run": {"$lte": now}},
+            {"$set": {"next_run": now + timedelta(hours=INTERVAL_HOURS), "owner": owner, "started_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Not due yet (the upsert collided with the existing lease) or another worker won
+        return None
+
+def run_if_due(db, owner=None):
+    """Compacts if this process wins the current interval's lease. Cheap to call often."""
+    global _next_check
+    if INTERVAL_HOURS <= 0 or time.monotonic() < _next_check:
+        return None
+    _next_check = time.monotonic() + 60
+    if not claim_run(db, owner or f"{socket.gethostname()}:{os.getpid()}"):
+        return None
+
+    print("🧹 Running scheduled retention compaction")
+    try:
+        removed = compact(db)
+    except Exception as e:
+        db.retention_runs.update_one({"_id": "compaction"}, {"$set": {
+            "next_run": datetime.utcnow() + RETRY_AFTER, "failed_at": datetime.utcnow(), "error": str(e)}})
+        raise
+    db.retention_runs.update_one({"_id": "compaction"}, {"$set": {"finished_at": datetime.utcnow(), "removed": removed}})
+    return removed
+
+if __name__ == '__main__':
+    from database import connect
+    from indexes import ensure_indexes
+
+    parser = argparse.ArgumentParser(description="Rolls up, archives and deletes old price observations.")
+    parser.add_argument("--collection", action="append", choices=list(RETENTION), help="only this collection (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be compacted")
+    opts = parser.parse_args()
+
+    db = connect()
+    ensure_indexes(db)
+    print(compact(db, opts.collection, opts.dry_run))
@@ -0,0 +1,171 @@
+import sys
+from datetime import datetime, timedelta
+from pymongo import DeleteOne, UpdateOne
+from storage import on_ingest, normalize_term, day_of
+
+# --- DAILY PRICE ROLLUPS ---
+# db.price_daily holds one document per (collection, commodity, source, day) with
+# min/max/sum/count/avg and the last price seen that day. The ingest hook folds every newly
+# inserted record in, so dashboards and charts never need to read raw observations. A record
+# that overwrote an existing row (same RECORD_KEY) can't be folded in without counting the
+# old price too, so its day is recomputed from the raw rows instead.
+ROLLUP_COLLECTIONS = ('scrapped_items', 'live_searches')
+
+def commodity_of(collection_name, record):
+    """Dashboard items are grouped by commodity_name, live searches by normalized term."""
+    if collection_name == 'live_searches':
+        return record.get('search_key') or normalize_term(record.get('search_term'))
+    return record.get('commodity_name')
+
+def _commodity_field(collection_name):
+    return 'search_key' if collection_name == 'live_searches' else 'commodity_name'
+
+def _group(collection_name, record):
+    return (commodity_of(collection_name, record), record['source'], day_of(record['created_at']))
+
+def _literal(value):
+    return {"$literal": value}
+
+def _fold(key, category, low, high, total, count, last, at):
+    """Upsert adding one batch of observations (a record or another rollup) to a rollup."""
+    return UpdateOne({"_id": key}, [
+        {"$set": {
+            "collection": _literal(key['collection']),
+            "commodity": _literal(key['commodity']),
+            "source": _literal(key['source']),
+            "day": _literal(key['day']),
+            "category": {"$ifNull": [_literal(category), "$category"]},
+            "min": {"$min": [{"$ifNull": ["$min", low]}, low]},
+            "max": {"$max": [{"$ifNull": ["$max", high]}, high]},
+            "sum": {"$add": [{"$ifNull": ["$sum", 0]}, total]},
+            "count": {"$add": [{"$ifNull": ["$count", 0]}, count]},
+            # Both expressions see the document as it was before this stage
+            "last": {"$cond": [{"$gte": [_literal(at), {"$ifNull": ["$last_at", datetime.min]}]}, last, "$last"]},
+            "last_at": {"$max": [{"$ifNull": ["$last_at", _literal(at)]}, _literal(at)]},
+        }},
+        {"$set": {"avg": {"$divide": ["$sum", "$count"]}}},
+    ], upsert=True)
+
+def rollup_update(collection_name, record):
+    price = record['price']
+    key = {"collection": collection_name, "commodity": commodity_of(collection_name, record),
+           "source": record['source'], "day": day_of(record['created_at'])}
+    return _fold(key, record.get('category'), price, price, price, 1, price, record['created_at'])
+
+def rekey(db):
+    """Moves live-search rollups filed under a commodity that isn't in normalize_term form
+    (older normalizations, or rows rolled up before they had a search_key) onto the normalized
+    one, merging them in place so days whose raw rows have expired keep their history.
+    Returns the number of rollups moved."""
+    ops = []
+    for commodity in db.price_daily.distinct("commodity", {"collection": "live_searches"}):
+        key = normalize_term(commodity)
+        if key == commodity:
+            continue
+        for doc in db.price_daily.find({"collection": "live_searches", "commodity": commodity}):
+            target = dict(doc['_id'], commodity=key)
+            ops.append(_fold(target, doc.get('category'), doc['min'], doc['max'], doc['sum'],
+                             doc['count'], doc['last'], doc['last_at']))
+            ops.append(DeleteOne({"_id": doc['_id']}))
+    # Ordered, so each rollup is merged before it is removed
+    for start in range(0, len(ops), 1000):
+        db.price_daily.bulk_write(ops[start:start + 1000])
+    return len(ops) // 2
+
+@on_ingest
+def update_rollups(db, collection_name, records, inserted):
+    if collection_name not in ROLLUP_COLLECTIONS or not records:
+        return
+    new = {id(r) for r in inserted}
+    overwritten = {_group(collection_name, r) for r in records if id(r) not in new}
+    updates = [rollup_update(collection_name, r) for r in inserted if _group(collection_name, r) not in overwritten]
+    if updates:
+        db.price_daily.bulk_write(updates, ordered=False)
+    if overwritten:
+        recompute(db, collection_name, overwritten)
+
+def recompute(db, collection_name, groups):
+    """Rebuilds the given (commodity, source, day) rollups from the raw rows."""
+    field = _commodity_field(collection_name)
+    match = {"$or": [
+        {field: commodity, "source": source, "created_at": {"$gte": day, "$lt": day + timedelta(days=1)}}
+        for commodity, source, day in groups
+    ]}
+    backfill(db, collection_name, match=match)
+
+def backfill(db, collection_name, start=None, end=None, match=None):
+    """Rebuilds the rollups of one raw collection from scratch (replaces matching days),
+    optionally only for observations in [start, end) and/or matching `match`."""
+    if collection_name == 'live_searches':
+        if match is None:
+            # The key must be normalize_term's, which has no aggregation equivalent: set it first
+            import search_index
+            search_index.key_live_searches(db)
+        commodity = "$search_key"
+    else:
+        commodity = "$commodity_name"
+
+    conditions = dict(match or {})
+    if start or end:
+        window = {}
+        if start:
+            window['$gte'] = start
+        if end:
+            window['$lt'] = end
+        conditions['created_at'] = window
+    pipeline = [{"$match": conditions}] if conditions else []
+    pipeline += [
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": {
+                "collection": collection_name,
+                "commodity": commodity,
+                "source": "$source",
+                "day": {"$dateTrunc": {"date": "$created_at", "unit": "day"}},
+            },
+            "category": {"$last": "$category"},
+            "min": {"$min": "$price"},
+            "max": {"$max": "$price"},
+            "sum": {"$sum": "$price"},
+            "count": {"$sum": 1},
+            "last": {"$last": "$price"},
+            "last_at": {"$last": "$created_at"},
+        }},
+        {"$set": {
+            "collection": "$_id.collection",
+            "commodity": "$_id.commodity",
+            "source": "$_id.source",
+            "day": "$_id.day",
+            "avg": {"$divide": ["$sum", "$count"]},
+        }},
+        {"$merge": {"into": "price_daily", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    db[collection_name].aggregate(pipeline, allowDiskUse=True)
+
+def category_cards(db, category_name):
+    """Per-commodity cheapest/avg/max for a dashboard category, from the rollups."""
+    pipeline = [
+        {"$match": {"collection": "scrapped_items", "category": category_name}},
+        {"$sort": {"min": 1}},
+        {"$group": {
+            "_id": "$commodity",
+            "cheapest_price": {"$first": "$min"},
+            "cheapest_source": {"$first": "$source"},
+            "sum": {"$sum": "$sum"},
+            "count": {"$sum": "$count"},
+            "max_price": {"$max": "$max"},
+            "sources": {"$addToSet": "$source"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+    return list(db.price_daily.aggregate(pipeline))
+
+if __name__ == '__main__':
+    from database import connect
+    if '--backfill' not in sys.argv:
+        print("Usage: python rollups.py --backfill")
+        sys.exit(1)
+    db = connect()
+    for name in ROLLUP_COLLECTIONS:
+        backfill(db, name)
+        print(f"✅ Backfilled price_daily from {name}")
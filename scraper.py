@@ -1,14 +1,29 @@
 import time
 import os
 import json
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from urllib.parse import urlparse
 import google.generativeai as genai
 from datetime import datetime
 from dotenv import load_dotenv
 from pathlib import Path
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from driver_pool import get_pool, new_driver
+from llm_cache import get_llm_cache, make_key
+from extractors import BrowserPage, extract_items, tile_text
+from storage import RecordWriter, normalize_term, day_of
+import fingerprints
+from breaker import breaker_for
+from fetchers import fetch_html, count_tier
+from metrics import timed, STAGE_SECONDS, PAGES, LLM_CALLS, LLM_PROMPT_CHARS, LLM_TOKENS
+import summaries  # registers the category-count ingest hook
+import alerts  # registers the alert-matching ingest hook
+import rollups  # registers the daily price rollup ingest hook
+import search_index  # registers the search-term ingest hook
 
 # --- CONFIGURATION ---
 env_path = Path(__file__).parent / '.env'
@@ -20,18 +35,111 @@ if GEMINI_API_KEY:
     # Use the model available to your account
     model = genai.GenerativeModel('gemini-2.5-flash')
 
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", 30))
+
+# Bump whenever the extraction prompt changes so cached answers are not reused
+PROMPT_VERSION = "v1"
+
+# Batched extraction: pages are packed into one request up to this many (estimated) tokens
+LLM_BATCH_TOKEN_BUDGET = int(os.environ.get("LLM_BATCH_TOKEN_BUDGET", 30000))
+CHARS_PER_TOKEN = 4
+BATCH_SECTION_OVERHEAD = 50
+
+# --- SOURCES ---
+# Each source says how to build its search URL and when its results page is ready:
+#   results     CSS selector for product tiles
+#   no_results  lower-case text shown when the search matched nothing
+#   timeout     max seconds to wait for either of the above
+#   fetch       'http' to try a plain keep-alive HTTP request first (server-rendered pages);
+#               the default is a headless browser
+SOURCES = {
+    'Naivas': {
+        'url': "https://naivas.online/search?term={query}",
+        'results': "div[class*='product-card'], div[class*='product-item'], a[href*='/product/']",
+        'no_results': ["no products found", "no results found"],
+        'timeout': 12,
+    },
+    'Jumia': {
+        'url': "https://www.jumia.co.ke/catalog/?q={query}",
+        'fetch': 'http',  # server-rendered results, no browser needed
+        'results': "article.prd",
+        'no_results': ["there are no results for"],
+        'timeout': 10,
+    },
+    'Carrefour': {
+        'url': "https://www.carrefour.ke/mafken/en/search?keyword={query}",
+        'results': "[data-testid='product_card'], div[class*='product-card'], ul[data-testid='scrollable-list-view'] li",
+        'no_results': ["no results found", "we couldn't find any results"],
+        'timeout': 15,
+    },
+}
+
+COMMODITIES = [
+    {'name': 'Fresh Milk 500ml', 'category': 'Food'},
+    {'name': 'Sugar 1kg', 'category': 'Food'},
+    {'name': 'Maize Meal 2kg', 'category': 'Food'},
+    {'name': 'Wheat Flour 2kg', 'category': 'Food'},
+#     {'name': 'Cooking Oil 1L', 'category': 'Food'},
+#     {'name': 'Rice 2kg', 'category': 'Food'},
+#     {'name': 'White Bread 600g', 'category': 'Food'}, 
+#     {'name': 'Table Salt 1kg', 'category': 'Food'},
+#     {'name': 'Toilet Paper 4 Pack', 'category': 'Home'},
+#     {'name': 'Bathing Soap', 'category': 'Home'},
+#     {'name': 'Toothpaste', 'category': 'Home'}
+]
+
+# --- CONCURRENCY ---
+# Total (commodity, source) pairs scraped at once, and how many of those may hit the same site.
+MAX_CONCURRENCY = int(os.environ.get("SCRAPE_CONCURRENCY", 6))
+PER_DOMAIN_LIMIT = int(os.environ.get("SCRAPE_PER_DOMAIN", 2))
+
+# Live searches return at the deadline with whatever finished; the rest keep running here
+LIVE_DEADLINE_SECONDS = float(os.environ.get("LIVE_DEADLINE_SECONDS", 25))
+_background = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="live-scrape")
+
+# Live scrapes in progress by (normalized term, source). A search needing a source that is
+# already being scraped, e.g. one still finishing after an earlier search's deadline, waits
+# on that scrape instead of starting another; every caller gets its own callbacks.
+_live_in_flight = {}
+_live_in_flight_lock = threading.Lock()
+
+_domain_semaphores = {}
+_domain_semaphores_lock = threading.Lock()
+
 def get_driver():
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=chrome_options)
-
-def ask_gemini(page_text, item_name, supermarket):
-    print(f"🤖 Gemini is scanning {supermarket} for '{item_name}'...")
-    
+    """Standalone browser outside the pool (caller must quit it)."""
+    return new_driver()
+
+def _parse_llm_json(text):
+    return json.loads(text.replace('```json', '').replace('```', '').strip())
+
+def _valid_extraction(data):
+    return isinstance(data, dict) and isinstance(data.get('items'), list)
+
+def _call_gemini(kind, prompt, **kwargs):
+    """generate_content plus its JSON parse, timed and counted per call kind ('single'/'batch')."""
+    LLM_PROMPT_CHARS.inc(len(prompt), kind=kind)
+    try:
+        with timed(f"llm_{kind}"):
+            response = model.generate_content(prompt, request_options={"timeout": LLM_TIMEOUT_SECONDS}, **kwargs)
+    except Exception:
+        LLM_CALLS.inc(kind=kind, outcome="error")
+        raise
+
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None:
+        LLM_TOKENS.inc(getattr(usage, 'prompt_token_count', 0) or 0, kind=kind, direction="prompt")
+        LLM_TOKENS.inc(getattr(usage, 'candidates_token_count', 0) or 0, kind=kind, direction="output")
+    try:
+        data = _parse_llm_json(response.text)
+    except Exception:
+        LLM_CALLS.inc(kind=kind, outcome="parse_error")
+        raise
+    LLM_CALLS.inc(kind=kind, outcome="ok")
+    return data
+
+def _gemini_single(page_text, item_name, supermarket):
+    """One page, one call. Raises on API or parse errors."""
     # UPDATED PROMPT: Asks for a LIST of items
     prompt = f"""
     I have text from the {supermarket} website search results for "{item_name}".
@@ -53,127 +161,467 @@ def ask_gemini(page_text, item_name, supermarket):
     4. If nothing found, return an empty list for "items".
     
     PAGE TEXT:
-    {page_text[:25000]}
+    {page_text}
     """
-    
+    data = _call_gemini("single", prompt)
+    if not _valid_extraction(data):
+        raise ValueError("response has no 'items' list")
+    return data
+
+def ask_gemini(page_text, item_name, supermarket, cache=None):
+    page_text = page_text[:25000]
+    key = None
+    if cache is not None:
+        key = make_key(page_text, item_name, supermarket, PROMPT_VERSION)
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"💾 Cached extraction for {supermarket} / '{item_name}'")
+            return cached
+
+    print(f"🤖 Gemini is scanning {supermarket} for '{item_name}'...")
     try:
-        response = model.generate_content(prompt)
-        text = response.text.replace('```json', '').replace('```', '').strip()
-        return json.loads(text)
+        data = _gemini_single(page_text, item_name, supermarket)
+        if key is not None:
+            cache.set(key, data)
+        return data
     except Exception as e:
         print(f"⚠️ Gemini Error: {e}")
         return {"items": []}
 
-def process_site_search(driver, db, search_term, source, url_template, collection_name='live_searches'):
+def plan_batches(excerpts, budget=LLM_BATCH_TOKEN_BUDGET):
+    """Greedily packs excerpts into batches whose estimated prompt size fits the token budget."""
+    batches, current, used = [], [], 0
+    for excerpt in excerpts:
+        cost = len(excerpt['text']) // CHARS_PER_TOKEN + BATCH_SECTION_OVERHEAD
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(excerpt)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def _gemini_batch(batch):
+    """Several pages in one structured-output call. Returns {id: {"items": [...]}} for
+    the sections the model answered; raises if the response can't be parsed at all."""
+    sections = "\n\n".join(
+        f"### SECTION {ex['id']}\nSupermarket: {ex['source']}\nSearch: \"{ex['search_term']}\"\n{ex['text']}"
+        for ex in batch
+    )
+    prompt = f"""
+    Below are several sections of supermarket search-result text. Each section has an ID, the supermarket and the user's search query.
+    For EACH section, find ALL products that match that section's search query, specifically matching the name and quantity/unit if specified.
+    
+    Return ONLY a JSON object of the form {{"results": [{{"id": "<section id>", "items": [...]}}]}} with one entry per section.
+    
+    Each item must have:
+    - "product_name": The full specific name (e.g. "Festive Bread 600g")
+    - "price": The numeric price (e.g. 65)
+    - "description": Short description
+    - "unit": Estimate the unit (e.g. "600g")
+    - "location": The section's supermarket
+    
+    RULES:
+    1. Include multiple brands if they match the search (e.g. if searching "Bread 600g", return Festive, Supaloaf, Broadways).
+    2. Ignore ads or unrelated items (e.g. ignore "400g" if searching for "600g" unless it's the only option).
+    3. Limit to the top 5 most relevant matches per section.
+    4. Never mix products between sections. If nothing is found in a section, return an empty list for its "items".
+    
+    {sections}
+    """
+    data = _call_gemini("batch", prompt, generation_config={"response_mime_type": "application/json"})
+
+    ids = {ex['id'] for ex in batch}
+    results = {}
+    for entry in data.get('results', []):
+        entry_id = str(entry.get('id', ''))
+        if entry_id in ids and isinstance(entry.get('items'), list):
+            results[entry_id] = {'items': entry['items']}
+    return results
+
+def ask_gemini_batch(excerpts, cache=None):
+    """Extracts many pages with as few LLM calls as possible.
+    `excerpts` is a list of {'id', 'text', 'search_term', 'source'}; returns {id: {"items": [...]}}.
+    Sections missing from a batch answer (or a batch that fails outright) are retried one by one."""
+    results = {}
+    pending = []
+    for excerpt in excerpts:
+        excerpt = dict(excerpt, id=str(excerpt['id']), text=excerpt['text'][:25000])
+        if cache is not None:
+            excerpt['key'] = make_key(excerpt['text'], excerpt['search_term'], excerpt['source'], PROMPT_VERSION)
+            cached = cache.get(excerpt['key'])
+            if cached is not None:
+                results[excerpt['id']] = cached
+                continue
+        pending.append(excerpt)
+
+    def run(batch):
+        answered = {}
+        failed = set()
+        if len(batch) > 1:
+            print(f"🤖 Gemini is scanning {len(batch)} pages in one batch...")
+            try:
+                answered = _gemini_batch(batch)
+            except Exception as e:
+                print(f"⚠️ Gemini batch error, falling back to single calls: {e}")
+
+        for excerpt in batch:
+            if excerpt['id'] in answered:
+                continue
+            print(f"🤖 Gemini is scanning {excerpt['source']} for '{excerpt['search_term']}'...")
+            try:
+                answered[excerpt['id']] = _gemini_single(excerpt['text'], excerpt['search_term'], excerpt['source'])
+            except Exception as e:
+                print(f"⚠️ Gemini Error: {e}")
+                answered[excerpt['id']] = {"items": []}
+                failed.add(excerpt['id'])
+
+        if cache is not None:
+            for excerpt in batch:
+                if excerpt['id'] not in failed:
+                    cache.set(excerpt['key'], answered[excerpt['id']])
+        return answered
+
+    batches = plan_batches(pending)
+    if batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENCY, len(batches)))) as pool:
+            for answered in pool.map(run, batches):
+                results.update(answered)
+    return results
+
+def wait_for_results(driver, source):
+    """Blocks until the source shows product tiles or its "no results" marker.
+    Returns 'results', 'empty' or 'timeout'."""
+    spec = SOURCES.get(source, {})
+    selector = spec.get('results')
+    markers = spec.get('no_results', [])
+    started = time.monotonic()
+
+    def ready(d):
+        if selector and d.find_elements(By.CSS_SELECTOR, selector):
+            return 'results'
+        if markers:
+            # Visible text only, so hidden templates don't count as "no results"
+            page = d.find_element(By.TAG_NAME, "body").text.lower()
+            if any(marker in page for marker in markers):
+                return 'empty'
+        return False
+
+    try:
+        outcome = WebDriverWait(driver, spec.get('timeout', 10), poll_frequency=0.25).until(ready)
+    except TimeoutException:
+        outcome = 'timeout'
+
+    waited = time.monotonic() - started
+    STAGE_SECONDS.observe(waited, stage="page_wait", source=source)
+    PAGES.inc(source=source, outcome=outcome)
+    print(f"[{source}] Page {outcome} after {waited:.1f}s")
+    return outcome
+
+def build_search_url(search_term, source, url_template):
+    # URL ENCODING: Replace spaces with + or %20 based on site
+    if source == "Naivas":
+        query = search_term.replace(" ", "+")
+    else:
+        query = search_term.replace(" ", "%20")
+    return url_template.format(query=query)
+
+def inspect_page(db, page, search_term, source, collection_name='live_searches'):
+    """Fingerprints a loaded results page and tries the deterministic parsers.
+    Returns a dict with the page 'fingerprint' and either parsed 'data' or the tile text the
+    LLM still has to read ('excerpt'). Pages identical to the last scrape come back with
+    'unchanged' set to the remembered fingerprint document."""
+    tiles = page.select(SOURCES[source]['results'])
+    # LLM fallback sees only the product tiles when we found any
+    region = tile_text(tiles) or page.text
+    page_hash = fingerprints.fingerprint(region)
+    result = {'fingerprint': page_hash, 'data': None, 'excerpt': None, 'unchanged': None}
+
+    remembered = fingerprints.previous(db, collection_name, source, search_term, page_hash)
+    if remembered:
+        result['unchanged'] = remembered
+        result['data'] = {'items': remembered.get('items', [])}
+        return result
+
+    with timed("parse", source):
+        result['data'] = extract_items(source, tiles, search_term)
+    if result['data'] is None:
+        result['excerpt'] = region
+    return result
+
+def fetch_site(driver, db, search_term, source, url_template, collection_name='live_searches'):
+    """Loads a search page in the browser and inspects it (see inspect_page).
+    Returns None when the site reported no results."""
+    url = build_search_url(search_term, source, url_template)
+    print(f"[{source}] Visiting: {url}")
+
+    breaker = breaker_for(url)
+    try:
+        with timed("page_load", source):
+            driver.get(url)
+    except Exception:
+        breaker.record_failure()
+        raise
+    outcome = wait_for_results(driver, source)
+    if outcome == 'timeout':
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    if outcome == 'empty':
+        print(f"⚠️ {source}: No results page for {search_term}")
+        return None
+
+    return inspect_page(db, BrowserPage(driver), search_term, source, collection_name)
+
+def fetch_site_http(db, search_term, source, url_template, collection_name='live_searches'):
+    """HTTP-tier counterpart of fetch_site. Returns (handled, result); handled is False when
+    the plain HTML had neither product tiles nor a "no results" marker, i.e. it needs the browser."""
+    url = build_search_url(search_term, source, url_template)
+    print(f"[{source}] Fetching: {url}")
+    breaker = breaker_for(url)
+    try:
+        with timed("http_fetch", source):
+            page = fetch_html(url)
+    except Exception as e:
+        breaker.record_failure()
+        if not breaker.allow():
+            # The site looks down: a browser visit would only add another timeout
+            raise
+        print(f"⚠️ {source}: HTTP fetch failed, using the browser: {e}")
+        return False, None
+    breaker.record_success()
+
+    spec = SOURCES[source]
+    if page.select(spec['results']):
+        PAGES.inc(source=source, outcome='results')
+        return True, inspect_page(db, page, search_term, source, collection_name)
+    text = page.text.lower()
+    if any(marker in text for marker in spec.get('no_results', [])):
+        PAGES.inc(source=source, outcome='empty')
+        print(f"⚠️ {source}: No results page for {search_term}")
+        return True, None
+    return False, None
+
+def finish_site(db, result, search_term, source, collection_name='live_searches', writer=None):
+    """Saves a fetched page's items and remembers its fingerprint. Returns True if it had matches."""
+    if result is None:
+        return False
+
+    remembered = result['unchanged']
+    if remembered and remembered.get('written_day') == day_of(datetime.utcnow()):
+        # Already written today: just note we saw it again
+        fingerprints.heartbeat(db, collection_name, source, search_term)
+        print(f"♻️ {source}: '{search_term}' unchanged since last scrape")
+        return bool(remembered.get('items'))
+
+    saved = save_items(db, result['data'], search_term, source, collection_name, writer)
+    if saved:
+        fingerprints.remember(db, collection_name, source, search_term, result['fingerprint'], result['data']['items'])
+    return saved
+
+def save_items(db, data, search_term, source, collection_name='live_searches', writer=None):
+    """Stores extracted items (buffered in `writer` when given). Returns True if at least one was saved."""
+    own_writer = writer is None
+    if own_writer:
+        writer = RecordWriter(db, collection_name)
+    saved_count = 0
+    
+    # Loop through the list of items found
+    if data and 'items' in data and isinstance(data['items'], list):
+        for item in data['items']:
+            if item.get('product_name') != "N/A" and item.get('price', 0) > 0:
+                record = {
+                    'search_term': search_term, 
+                    'search_key': normalize_term(search_term),
+                    'commodity_name': search_term,
+                    'product_name': item['product_name'],
+                    'price': float(item['price']),
+                    'source': source,
+                    'category': 'General',
+                    'description': item.get('description', ''),
+                    'unit': item.get('unit', 'Unit'),
+                    'created_at': datetime.utcnow()
+                }
+                writer.add(record)
+                print(f"✅ FOUND: {source} | {item['product_name']} @ {item['price']}")
+                saved_count += 1
+    if own_writer:
+        writer.flush()
+    
+    if saved_count > 0:
+        return True
+    print(f"⚠️ {source}: No match for {search_term}")
+    return False
+
+def process_site_search(driver, db, search_term, source, url_template, collection_name='live_searches', writer=None):
     """Helper to scrape a single site"""
     try:
-        # URL ENCODING: Replace spaces with + or %20 based on site
-        if source == "Naivas":
-            query = search_term.replace(" ", "+")
-        else:
-            query = search_term.replace(" ", "%20")
-            
-        url = url_template.format(query=query)
-        print(f"[{source}] Visiting: {url}")
-        
-        driver.get(url)
-        time.sleep(5) # Wait for JS to load results
-        
-        body = driver.find_element("tag name", "body").text
-        data = ask_gemini(body, search_term, source)
-        
-        saved_count = 0
-        
-        # Loop through the list of items found
-        if data and 'items' in data and isinstance(data['items'], list):
-            for item in data['items']:
-                if item.get('product_name') != "N/A" and item.get('price', 0) > 0:
-                    record = {
-                        'search_term': search_term, 
-                        'commodity_name': search_term,
-                        'product_name': item['product_name'],
-                        'price': float(item['price']),
-                        'source': source,
-                        'category': 'General',
-                        'description': item.get('description', ''),
-                        'unit': item.get('unit', 'Unit'),
-                        'created_at': datetime.utcnow()
-                    }
-                    db[collection_name].insert_one(record)
-                    print(f"✅ FOUND: {source} | {item['product_name']} @ {item['price']}")
-                    saved_count += 1
-        
-        if saved_count > 0:
-            return True
-        else:
-            print(f"⚠️ {source}: No match for {search_term}")
-            
+        result = fetch_site(driver, db, search_term, source, url_template, collection_name)
+        if result and result['excerpt'] is not None:
+            result['data'] = ask_gemini(result['excerpt'], search_term, source, cache=get_llm_cache(db))
+        return finish_site(db, result, search_term, source, collection_name, writer)
     except Exception as e:
         print(f"❌ Failed {source}: {e}")
     return False
 
-def scrape_single_item(db, search_term, targets=None):
-    """LIVE SEARCH: Scrapes a specific item on demand."""
-    driver = get_driver()
-    results_count = 0
-    
-    if not targets:
-        targets = ['Naivas', 'Jumia', 'Carrefour']   
-    
+def domain_semaphore(url):
+    """Shared per-domain limiter so parallel scrapes don't hammer one site."""
+    domain = urlparse(url).netloc
+    with _domain_semaphores_lock:
+        if domain not in _domain_semaphores:
+            _domain_semaphores[domain] = threading.BoundedSemaphore(PER_DOMAIN_LIMIT)
+        return _domain_semaphores[domain]
+
+def _scrape_task(db, search_term, source, collection_name, writer, defer_llm=False):
+    """Runs one (search_term, source) pair: over plain HTTP when the source allows it,
+    otherwise (or if that fails) on a pooled browser.
+    With defer_llm, pages that need the LLM come back as {'excerpt': text, 'result': ...} for batching."""
+    url_template = SOURCES[source]['url']
+    if not breaker_for(url_template).allow():
+        print(f"🔌 Skipping {source}: too many recent failures")
+        return False
+
+    with domain_semaphore(url_template):
+        try:
+            handled = False
+            if SOURCES[source].get('fetch') == 'http':
+                handled, result = fetch_site_http(db, search_term, source, url_template, collection_name)
+                count_tier(source, 'http' if handled else 'http_fallback')
+            if not handled:
+                with get_pool().driver() as driver:
+                    result = fetch_site(driver, db, search_term, source, url_template, collection_name)
+                if SOURCES[source].get('fetch') != 'http':
+                    count_tier(source, 'browser')
+        except Exception as e:
+            print(f"❌ Failed {source}: {e}")
+            return False
+
+    # The browser is back in the pool before any LLM work starts
+    if result and result['excerpt'] is not None:
+        if defer_llm:
+            return {'excerpt': result['excerpt'], 'result': result}
+        result['data'] = ask_gemini(result['excerpt'], search_term, source, cache=get_llm_cache(db))
+    return finish_site(db, result, search_term, source, collection_name, writer)
+
+def run_scrape_tasks(db, tasks, collection_name='live_searches', batch_llm=False, on_progress=None):
+    """Scrapes (search_term, source) pairs in parallel. Returns how many found a match.
+    With batch_llm, pages the parsers couldn't handle are extracted together afterwards.
+    on_progress(done, total) is called as pages finish."""
+    count = 0
+    if not tasks:
+        return count
+
+    done = 0
+    total = len(tasks)
+
+    def progress():
+        if on_progress:
+            try:
+                on_progress(done, total)
+            except Exception as e:
+                print(f"⚠️ Progress update failed: {e}")
+
+    pending = []
+    writer = RecordWriter(db, collection_name)
+    workers = max(1, min(MAX_CONCURRENCY, len(tasks)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_scrape_task, db, term, source, collection_name, writer, batch_llm): (term, source) for term, source in tasks}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Scrape task failed: {e}")
+                result = False
+            if isinstance(result, dict):
+                term, source = futures[future]
+                pending.append({'id': f"p{len(pending)}", 'text': result['excerpt'], 'search_term': term, 'source': source, 'result': result['result']})
+                continue
+            if result:
+                count += 1
+            done += 1
+            progress()
+
+    if pending:
+        answers = ask_gemini_batch(pending, cache=get_llm_cache(db))
+        for excerpt in pending:
+            excerpt['result']['data'] = answers.get(excerpt['id'])
+            try:
+                if finish_site(db, excerpt['result'], excerpt['search_term'], excerpt['source'], collection_name, writer):
+                    count += 1
+            except Exception as e:
+                print(f"❌ Failed {excerpt['source']}: {e}")
+            done += 1
+        progress()
+
+    writer.flush()
+    return count
+
+def _live_task(db, search_term, source):
+    """One live-search source with its own writer, so it can land after the request has returned."""
     try:
-        # 1. Naivas (Updated URL)
-        if 'Naivas' in targets:
-            if process_site_search(driver, db, search_term, "Naivas", "https://naivas.online/search?term={query}"): 
-                results_count += 1
-        
-        # 2. Jumia (Standard URL)
-        if 'Jumia' in targets:
-            if process_site_search(driver, db, search_term, "Jumia", "https://www.jumia.co.ke/catalog/?q={query}"): 
-                results_count += 1
-        
-        # 3. Carrefour (Updated URL)
-        if 'Carrefour' in targets:
-            if process_site_search(driver, db, search_term, "Carrefour", "https://www.carrefour.ke/mafken/en/search?keyword={query}"): 
-                results_count += 1
-                
-    finally:
-        driver.quit()
-        
-    return results_count
-
-def scrape_real_data(db):
-    """DASHBOARD UPDATE: Scrapes fixed list from ALL supermarkets."""
-    driver = get_driver()
-    
-    commodities = [
-        {'name': 'Fresh Milk 500ml', 'category': 'Food'},
-        {'name': 'Sugar 1kg', 'category': 'Food'},
-        {'name': 'Maize Meal 2kg', 'category': 'Food'},
-        {'name': 'Wheat Flour 2kg', 'category': 'Food'},
-    #     {'name': 'Cooking Oil 1L', 'category': 'Food'},
-    #     {'name': 'Rice 2kg', 'category': 'Food'},
-    #     {'name': 'White Bread 600g', 'category': 'Food'}, 
-    #     {'name': 'Table Salt 1kg', 'category': 'Food'},
-    #     {'name': 'Toilet Paper 4 Pack', 'category': 'Home'},
-    #     {'name': 'Bathing Soap', 'category': 'Home'},
-    #     {'name': 'Toothpaste', 'category': 'Home'}
-                ]
-    
+        with RecordWriter(db, 'live_searches') as writer:
+            return _scrape_task(db, search_term, source, 'live_searches', writer)
+    except Exception as e:
+        print(f"❌ Scrape task failed: {e}")
+        return False
+
+def _live_future(db, search_term, source):
+    key = (normalize_term(search_term), source)
+    with _live_in_flight_lock:
+        future = _live_in_flight.get(key)
+        started = future is None
+        if started:
+            future = _live_in_flight[key] = _background.submit(_live_task, db, search_term, source)
+    if started:
+        # Outside the lock: a finished future runs the callback right here
+        future.add_done_callback(lambda f: _live_finished(key, f))
+    return future
+
+def _live_finished(key, future):
+    with _live_in_flight_lock:
+        if _live_in_flight.get(key) is future:
+            del _live_in_flight[key]
+
+def _source_done(on_source_done, source, future):
+    try:
+        on_source_done(source, future.result())
+    except Exception as e:
+        print(f"⚠️ Source callback failed: {e}")
+
+def _live_search(db, search_term, targets, on_progress, on_source_done, deadline):
+    futures = []
+    for source in targets:
+        future = _live_future(db, search_term, source)
+        if on_source_done:
+            future.add_done_callback(partial(_source_done, on_source_done, source))
+        futures.append(future)
     count = 0
+    done = 0
     try:
-        for item in commodities:
-            search_term = item['name']
-            
-            # 1. Naivas
-            if process_site_search(driver, db, search_term, "Naivas", "https://naivas.online/search?term={query}", 'scrapped_items'): count += 1
-            
-            # 2. Jumia
-            if process_site_search(driver, db, search_term, "Jumia", "https://www.jumia.co.ke/catalog/?q={query}", 'scrapped_items'): count += 1
-            
-            # 3. Carrefour
-            if process_site_search(driver, db, search_term, "Carrefour", "https://www.carrefour.ke/mafken/en/search?keyword={query}", 'scrapped_items'): count += 1
-            
-            time.sleep(3)
-    finally:
-        driver.quit()
-    return count
\ No newline at end of file
+        for future in as_completed(futures, timeout=deadline):
+            done += 1
+            if future.result():
+                count += 1
+            if on_progress:
+                on_progress(done, len(targets))
+    except FuturesTimeout:
+        print(f"⏱️ Deadline hit for '{search_term}': {len(targets) - done} source(s) finishing in the background")
+    return count
+
+def scrape_single_item(db, search_term, targets=None, on_progress=None, on_source_done=None, deadline=LIVE_DEADLINE_SECONDS):
+    """LIVE SEARCH: Scrapes a specific item on demand.
+    Returns the number of sources with matches that finished within `deadline` seconds; slower
+    sources keep running in the background and store their results for the next view.
+    on_source_done(source, found) fires as each source completes, including late ones.
+    Calls needing a (normalized term, source) that is already being scraped share that scrape."""
+    if not targets:
+        targets = list(SOURCES)
+
+    targets = sorted(source for source in set(targets) if source in SOURCES)
+    return _live_search(db, search_term, targets, on_progress, on_source_done, deadline)
+
+def scrape_real_data(db, on_progress=None):
+    """DASHBOARD UPDATE: Scrapes fixed list from ALL supermarkets."""
+    tasks = [(item['name'], source) for item in COMMODITIES for source in SOURCES]
+    return run_scrape_tasks(db, tasks, 'scrapped_items', batch_llm=True, on_progress=on_progress)
@@ -0,0 +1,259 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from storage import on_ingest, normalize_term, tokens, unit_of, UNIT_PATTERN
+
+# --- PRODUCT SEARCH INDEX ---
+# db.search_terms holds one document per normalized term ('sugar 1kg') with the raw names it
+# was stored under in each collection ('Sugar 1kg', 'Sugar 1 Kg') and the product names seen
+# for it. Each process keeps an in-memory index over it (token postings over terms and product
+# names, trigram postings over terms) that answers exact and fuzzy lookups without touching the
+# price collections. The ingest hook adds new terms as they are scraped; other processes pick
+# them up with an incremental refresh every REFRESH_SECONDS.
+INDEXED_COLLECTIONS = ('scrapped_items', 'live_searches')
+REFRESH_SECONDS = float(os.environ.get("SEARCH_INDEX_REFRESH_SECONDS", 30))
+MIN_SIMILARITY = 0.35
+MAX_PRODUCTS = 50
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def raw_name(collection_name, record):
+    """The field each collection's routes query by."""
+    if collection_name == 'live_searches':
+        return record.get('search_term')
+    return record.get('commodity_name')
+
+class SearchIndex:
+    def __init__(self):
+        self.entries = {}
+        self.token_postings = {}
+        self.trigram_postings = {}
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def add(self, key, names=(), products=()):
+        """Adds (or extends) one term. `names` are (collection, raw name) pairs."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {'names': {}, 'products': set(), 'grams': len(trigrams(key))}
+                for gram in trigrams(key):
+                    self.trigram_postings.setdefault(gram, set()).add(key)
+                for token in tokens(key):
+                    self.token_postings.setdefault(token, set()).add(key)
+            for collection, name in names:
+                entry['names'].setdefault(collection, set()).add(name)
+            for product in products:
+                if product not in entry['products'] and len(entry['products']) < MAX_PRODUCTS:
+                    entry['products'].add(product)
+                    for token in tokens(normalize_term(product)):
+                        self.token_postings.setdefault(token, set()).add(key)
+
+    def knows(self, key, collection, name):
+        entry = self.entries.get(key)
+        return entry is not None and name in entry['names'].get(collection, ())
+
+    def names(self, key, collection):
+        entry = self.entries.get(key)
+        return sorted(entry['names'].get(collection, ())) if entry else []
+
+    def lookup(self, query, collection=None, limit=5):
+        """[(key, score)] best first. An exact normalized match scores 1.0; otherwise terms are
+        ranked by shared trigrams, with a bonus for words found in them or their product names.
+        Terms whose quantity differs from the query's ('sugar 2kg' for 'sugar 1kg') never match."""
+        key = normalize_term(query)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and (collection is None or collection in entry['names']):
+                return [(key, 1.0)]
+
+            query_grams = trigrams(key)
+            query_tokens = tokens(key)
+            candidates = {}
+            for gram in query_grams:
+                for candidate in self.trigram_postings.get(gram, ()):
+                    candidates[candidate] = candidates.get(candidate, 0) + 1
+            # Quantities ('1kg') are shared by unrelated products, so only other words count
+            query_words = {t for t in query_tokens if not UNIT_PATTERN.fullmatch(t)}
+            hits = {}
+            for token in query_words:
+                for candidate in self.token_postings.get(token, ()):
+                    hits[candidate] = hits.get(candidate, 0) + 1
+
+            unit = unit_of(key)
+            scored = []
+            for candidate, shared in candidates.items():
+                entry = self.entries[candidate]
+                if collection is not None and collection not in entry['names']:
+                    continue
+                if unit and unit_of(candidate) not in (None, unit):
+                    continue
+                # How many query words the term (or one of its products) has exactly, how much
+                # of the query it covers and how close the two are overall
+                words = hits.get(candidate, 0) / max(len(query_words), 1)
+                if not words:
+                    continue
+                coverage = shared / len(query_grams)
+                similarity = shared / (len(query_grams) + entry['grams'] - shared)
+                score = 0.5 * coverage + 0.2 * similarity + 0.3 * words
+                if score >= MIN_SIMILARITY:
+                    scored.append((candidate, round(score, 3)))
+        scored.sort(key=lambda pair: (-pair[1], pair[0]))
+        return scored[:limit]
+
+    def resolve(self, query, collection=None):
+        """Best matching term for the query, or None."""
+        found = self.lookup(query, collection, limit=1)
+        return found[0][0] if found else None
+
+    def containing(self, term, collection=None):
+        """Terms that contain `term` word for word, e.g. 'sugar 1kg' for 'sugar'."""
+        term = normalize_term(term)
+        with self._lock:
+            candidates = None
+            for token in tokens(term):
+                keys = {k for k in self.token_postings.get(token, ()) if token in tokens(k)}
+                candidates = keys if candidates is None else candidates & keys
+            return sorted(
+                key for key in candidates or ()
+                if term in key and (collection is None or collection in self.entries[key]['names'])
+            )
+
+    def apply(self, doc):
+        names = [(c, n) for c, values in doc.get('names', {}).items() for n in values]
+        self.add(doc['_id'], names, doc.get('products', []))
+
+_index = SearchIndex()
+_refresh_lock = threading.Lock()
+
+def get_index(db):
+    """The process-wide index, loaded on first use and refreshed incrementally afterwards."""
+    with _refresh_lock:
+        now = datetime.utcnow()
+        if _index.loaded_at is None or now - _index.loaded_at > timedelta(seconds=REFRESH_SECONDS):
+            query = {}
+            if _index.loaded_at is not None:
+                # Small overlap so writes that landed during the last refresh aren't missed
+                query = {"updated_at": {"$gte": _index.loaded_at - timedelta(seconds=5)}}
+            for doc in db.search_terms.find(query):
+                _index.apply(doc)
+            _index.loaded_at = now
+    return _index
+
+def term_update(key, collection_name, names, products):
+    return UpdateOne({"_id": key}, {
+        "$addToSet": {
+            f"names.{collection_name}": {"$each": sorted(names)},
+            "products": {"$each": sorted(products)[:MAX_PRODUCTS]},
+        },
+        "$set": {"updated_at": datetime.utcnow()},
+    }, upsert=True)
+
+@on_ingest
+def index_terms(db, collection_name, records, inserted):
+    """Records new (term, raw name) pairs and product names; known ones cost no write."""
+    if collection_name not in INDEXED_COLLECTIONS:
+        return
+    index = get_index(db)
+    pending = {}
+    for record in records:
+        name = raw_name(collection_name, record)
+        if not name:
+            continue
+        key = normalize_term(name)
+        product = record.get('product_name')
+        entry = index.entries.get(key)
+        if index.knows(key, collection_name, name) and (not product or product in entry['products']
+                                                        or len(entry['products']) >= MAX_PRODUCTS):
+            continue
+        names, products = pending.setdefault(key, (set(), set()))
+        names.add(name)
+        if product:
+            products.add(product)
+
+    if not pending:
+        return
+    db.search_terms.bulk_write([term_update(k, collection_name, n, p) for k, (n, p) in pending.items()], ordered=False)
+    for key, (names, products) in pending.items():
+        index.add(key, [(collection_name, n) for n in names], products)
+
+# --- REBUILD ---
+def key_live_searches(db, missing_only=True):
+    """Sets search_key on live searches stored without one (or, with missing_only=False, with
+    one from an older normalization). One pass over the rows, written back in batches by _id.
+    Returns {new key: records changed}."""
+    query = {"search_key": {"$exists": False}} if missing_only else {}
+    changed = {}
+    ops = []
+    for row in db.live_searches.find(query, {"search_term": 1, "search_key": 1}):
+        key = normalize_term(row.get('search_term'))
+        if row.get('search_key') == key:
+            continue
+        ops.append(UpdateOne({"_id": row['_id']}, {"$set": {"search_key": key}}))
+        changed[key] = changed.get(key, 0) + 1
+        if len(ops) >= 1000:
+            db.live_searches.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        db.live_searches.bulk_write(ops, ordered=False)
+    return changed
+
+def rebuild(db):
+    """Re-normalizes stored search keys and alert terms, rebuilds db.search_terms from the price
+    collections and moves live-search rollups onto the normalized keys."""
+    import rollups
+    import retention
+
+    changed = key_live_searches(db, missing_only=False)
+    print(f"🔑 Re-keyed {sum(changed.values())} live search records")
+
+    updates = [UpdateOne({"_id": a['_id']}, {"$set": {"term": normalize_term(a['item_name'])}})
+               for a in db.alerts.find({}, {"item_name": 1, "term": 1})
+               if a.get('term') != normalize_term(a['item_name'])]
+    if updates:
+        db.alerts.bulk_write(updates, ordered=False)
+    print(f"🔔 Re-normalized {len(updates)} alert terms")
+
+    db.search_terms.delete_many({})
+    terms = 0
+    for collection_name in INDEXED_COLLECTIONS:
+        field = 'search_term' if collection_name == 'live_searches' else 'commodity_name'
+        pipeline = [
+            {"$group": {"_id": f"${field}", "products": {"$addToSet": "$product_name"}}},
+            {"$project": {"products": {"$slice": ["$products", MAX_PRODUCTS]}}},
+        ]
+        ops = [term_update(normalize_term(row['_id']), collection_name, {row['_id']}, set(row['products']))
+               for row in db[collection_name].aggregate(pipeline, allowDiskUse=True) if row['_id']]
+        for start in range(0, len(ops), 1000):
+            db.search_terms.bulk_write(ops[start:start + 1000], ordered=False)
+        terms += len(ops)
+    print(f"🔎 Indexed {terms} terms into search_terms")
+
+    # Rollups are merged onto the new keys rather than rebuilt: raw rows past the retention
+    # window are gone, and their days only live on in price_daily
+    moved = rollups.rekey(db)
+    if changed:
+        # Days that still have all their raw rows are recomputed, picking up rows that were
+        # never rolled up under any key
+        start = retention.rolled_up_until(db, 'live_searches')
+        rollups.backfill(db, 'live_searches', start=start, match={"search_key": {"$in": sorted(changed)}})
+    print(f"✅ Moved {moved} live search rollups to their normalized keys")
+
+if __name__ == '__main__':
+    from database import connect
+    db = connect()
+    if '--rebuild' in sys.argv:
+        rebuild(db)
+    elif len(sys.argv) > 1:
+        index = get_index(db)
+        started = time.perf_counter()
+        found = index.lookup(" ".join(sys.argv[1:]))
+        print(f"{found} in {(time.perf_counter() - started) * 1000:.2f} ms")
+    else:
+        print("Usage: python search_index.py --rebuild | python search_index.py <query>")
+        sys.exit(1)
@@ -1,68 +1,244 @@
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
-from datetime import datetime, timedelta
+import argparse
 import random
-from pathlib import Path
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+from bson.objectid import ObjectId
+from werkzeug.security import generate_password_hash
+from database import connect
+from storage import normalize_term, day_of
 
-    
+# --- CATALOGUE ---
+# Commodities as the scraper names them ('Sugar 1kg'), with brands and a base price to vary around.
+PRODUCTS = [
+    {"name": "Fresh Milk", "cat": "Food", "sizes": ["500ml", "1L"], "base": 60, "brands": ["Brookside", "Tuzo", "Fresha", "KCC"]},
+    {"name": "Sugar", "cat": "Food", "sizes": ["1kg", "2kg"], "base": 150, "brands": ["Kabras", "Nutrameal", "Mumias", "Sony"]},
+    {"name": "Maize Meal", "cat": "Food", "sizes": ["1kg", "2kg"], "base": 130, "brands": ["Jogoo", "Pembe", "Soko", "Ajab"]},
+    {"name": "Wheat Flour", "cat": "Food", "sizes": ["1kg", "2kg"], "base": 170, "brands": ["Exe", "Ajab", "Jogoo", "Pembe"]},
+    {"name": "Cooking Oil", "cat": "Food", "sizes": ["1L", "3L"], "base": 300, "brands": ["Fresh Fri", "Rina", "Golden Fry", "Elianto"]},
+    {"name": "Rice", "cat": "Food", "sizes": ["1kg", "2kg"], "base": 220, "brands": ["Pishori", "Daawat", "Mwea", "Sunrice"]},
+    {"name": "White Bread", "cat": "Food", "sizes": ["400g", "600g"], "base": 65, "brands": ["Festive", "Supaloaf", "Broadways"]},
+    {"name": "Table Salt", "cat": "Food", "sizes": ["500g", "1kg"], "base": 40, "brands": ["Kensalt", "Kitui", "Magadi"]},
+    {"name": "Toilet Paper", "cat": "Home", "sizes": ["4 Pack", "10 Pack"], "base": 250, "brands": ["Softcare", "Velvex", "Rosy"]},
+    {"name": "Bathing Soap", "cat": "Home", "sizes": ["175g", "250g"], "base": 90, "brands": ["Geisha", "Protex", "Imperial Leather"]},
+    {"name": "Toothpaste", "cat": "Home", "sizes": ["100ml", "140g"], "base": 180, "brands": ["Colgate", "Aquafresh", "Close Up"]},
+]
+SOURCES = ["Jumia", "Naivas", "Carrefour"]
+SOURCE_MARKUP = {"Jumia": 1.05, "Naivas": 1.0, "Carrefour": 1.02}
 
+def catalogue():
+    """[{'name', 'category', 'unit', 'base', 'brands'}] for every product size."""
+    return [
+        {"name": f"{p['name']} {size}", "category": p['cat'], "unit": size,
+         "base": p['base'] * (1 + i * 0.8), "brands": p['brands']}
+        for p in PRODUCTS for i, size in enumerate(p['sizes'])
+    ]
 
-mongo_uri ="mongodb://localhost:27017/"
+def commodity_names():
+    return [c['name'] for c in catalogue()]
 
+# --- DOCUMENT GENERATORS ---
+# Each generator builds documents [start, stop) from its own seeded RNG, so chunks can be
+# produced in any process and the same options always give the same data. The scraper keeps
+# one row per (source, product_name, search_term, day) (storage.RECORD_KEY), so price rows are
+# enumerated over those slots instead of picked at random: document i goes to day i % days
+# and to the (i // days)-th slot of a fixed shuffle of the rest.
+def price_record(rng, commodity, brand, source, created_at, search_term):
+    # Slow drift over time plus daily noise, so charts have something to show
+    drift = 1 + 0.05 * ((created_at.toordinal() % 60) / 60)
+    price = commodity['base'] * SOURCE_MARKUP[source] * drift * rng.uniform(0.9, 1.1)
+    return {
+        'search_term': search_term,
+        'search_key': normalize_term(search_term),
+        'commodity_name': search_term,
+        'product_name': f"{brand} {commodity['name']}",
+        'price': round(price, 2),
+        'source': source,
+        'category': commodity['category'],
+        'description': '',
+        'unit': commodity['unit'],
+        'created_at': created_at,
+        'day': day_of(created_at),
+        'first_seen_at': created_at,
+    }
 
+def _moment(rng, now, days):
+    return now - timedelta(days=rng.randrange(days), seconds=rng.randrange(86400))
 
-client = MongoClient(mongo_uri)
-db = client.get_default_database('commodity_price_tracker')
+def price_slots(kind, seed):
+    """Every (commodity, brand, source, typed term) a day can hold, in a fixed shuffled order."""
+    slots = []
+    for commodity in catalogue():
+        # Users type the same thing in different ways; search_key folds them together
+        typed = [commodity['name']]
+        if kind == 'live_searches':
+            typed += [commodity['name'].lower(), f" {commodity['name'].upper()}"]
+        slots += [(commodity, brand, source, term)
+                  for brand in commodity['brands'] for source in SOURCES for term in typed]
+    random.Random(f"{seed}:{kind}:slots").shuffle(slots)
+    return slots
 
-# # Clear existing data (Optional - comment out if you want to keep data)
-# db.prices.delete_many({})
-# print("🗑️  Cleared old data.")
+def days_needed(kind, total, opts):
+    """--days, widened when there are more rows than slots in that many days."""
+    per_day = len(price_slots(kind, opts.seed))
+    return max(opts.days, -(-total // per_day))
 
-# Sample Data to Generate
-counties = ["Nairobi", "Mombasa", "Kisumu", "Nakuru"]
-sources = ["Jumia", "Naivas", "Carrefour"]
+def _slot_moment(rng, now, day):
+    start = day_of(now) - timedelta(days=day)
+    span = (now - start).total_seconds() if day == 0 else 86400
+    return start + timedelta(seconds=rng.randrange(max(int(span), 1)))
 
-commodities = [
-    {"name": "Milk", "cat": "dairy", "unit": "500ml", "base": 60, "brands": ["Brookside", "Tuzo", "Fresha"]},
-    {"name": "Sugar", "cat": "pantry", "unit": "1kg", "base": 150, "brands": ["Kabras", "Nutrameal", "Mumias"]},
-    {"name": "Maize Meal", "cat": "cereals", "unit": "2kg", "base": 200, "brands": ["Jogoo", "Pembe", "Soko"]},
-    {"name": "Cooking Oil", "cat": "pantry", "unit": "1L", "base": 300, "brands": ["Fresh Fri", "Rina", "Golden Fry"]},
-]
+def gen_prices(kind, rng, start, stop, opts, now):
+    slots = price_slots(kind, opts.seed)
+    days = opts.spread[kind]
+    for i in range(start, stop):
+        commodity, brand, source, term = slots[i // days]
+        yield price_record(rng, commodity, brand, source, _slot_moment(rng, now, i % days), term)
+
+def gen_users(rng, start, stop, opts, now, password_hash):
+    """Users plus their alerts, generated together so alerts can point at the user ids."""
+    bases = {c['name']: c['base'] for c in catalogue()}
+    for i in range(start, stop):
+        user_id = ObjectId()
+        yield 'users', {
+            "_id": user_id,
+            "name": f"Shopper {i}",
+            "email": f"user{i}@example.com",
+            "password": password_hash,
+            "role": "seller" if i % 10 == 0 else "buyer",
+            "created_at": _moment(rng, now, opts.days),
+        }
+        for item_name in rng.sample(sorted(bases), min(len(bases), opts.alerts_per_user)):
+            yield 'alerts', {
+                "item_name": item_name,
+                "term": normalize_term(item_name),
+                "user_id": str(user_id),
+                "target_price": round(bases[item_name] * rng.uniform(0.8, 1.0), 0),
+                "active": True,
+                "created_at": _moment(rng, now, opts.days),
+            }
+
+# --- WORKERS ---
+def _flush(db, buffers, name):
+    if buffers[name]:
+        db[name].insert_many(buffers[name], ordered=False)
+        buffers[name] = []
+
+def load_range(task):
+    """Generates and inserts one range of documents in chunks. Returns {collection: count}."""
+    kind, start, stop, opts, now, password_hash = task
+    db = connect()
+    rng = random.Random(f"{opts.seed}:{kind}:{start}")
+    buffers = {'scrapped_items': [], 'live_searches': [], 'users': [], 'alerts': []}
+    counts = {}
+
+    if kind == 'users':
+        docs = gen_users(rng, start, stop, opts, now, password_hash)
+    else:
+        docs = ((kind, doc) for doc in gen_prices(kind, rng, start, stop, opts, now))
+
+    for name, doc in docs:
+        buffers[name].append(doc)
+        counts[name] = counts.get(name, 0) + 1
+        if len(buffers[name]) >= opts.chunk:
+            _flush(db, buffers, name)
+    for name in buffers:
+        _flush(db, buffers, name)
+    return counts
+
+def plan(opts, now, password_hash):
+    """Splits every collection's target count into ranges of a few chunks each."""
+    step = opts.chunk * 4
+    tasks = []
+    for kind, total in (('scrapped_items', opts.items), ('live_searches', opts.live), ('users', opts.users)):
+        for start in range(0, total, step):
+            tasks.append((kind, start, min(total, start + step), opts, now, password_hash))
+    return tasks
+
+# --- REBUILDS ---
+# Seeded rows skip the ingest hooks, so derived collections are rebuilt afterwards.
+def rebuild(db, steps):
+    from indexes import ensure_indexes
+    import rollups
+    import summaries
+    import alerts
+    import search_index
+
+    if 'indexes' in steps:
+        ensure_indexes(db)
+        print("✅ Indexes ready")
+    if 'search' in steps:
+        # Search, details and new alerts look commodities up in db.search_terms
+        search_index.rebuild(db)
+        print("✅ Rebuilt search_terms")
+    if 'rollups' in steps:
+        for name in rollups.ROLLUP_COLLECTIONS:
+            rollups.backfill(db, name)
+        print("✅ Rebuilt price_daily")
+    if 'counts' in steps:
+        summaries.rebuild_category_counts(db)
+        print("✅ Rebuilt category_counts")
+    if 'alerts' in steps:
+        # Latest observation per commodity, then the normal ingest-time matching
+        latest = list(db.scrapped_items.aggregate([
+            {"$sort": {"created_at": -1}},
+            {"$group": {"_id": "$commodity_name", "doc": {"$first": "$$ROOT"}}},
+            {"$replaceRoot": {"newRoot": "$doc"}},
+        ], allowDiskUse=True))
+        alerts.evaluate(db, latest)
+        print(f"✅ Evaluated alerts against {len(latest)} commodities")
+
+SEEDED = ['scrapped_items', 'live_searches', 'users', 'alerts']
+DERIVED = ['price_daily', 'category_counts', 'notifications', 'page_fingerprints', 'search_terms']
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generates synthetic data in the database at MONGO_URI.")
+    parser.add_argument("--items", type=int, default=100_000, help="scrapped_items documents")
+    parser.add_argument("--live", type=int, default=20_000, help="live_searches documents")
+    parser.add_argument("--users", type=int, default=1_000, help="users (each gets --alerts-per-user alerts)")
+    parser.add_argument("--alerts-per-user", type=int, default=3)
+    parser.add_argument("--days", type=int, default=90, help="spread observations over this many days (more if the counts need it)")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--chunk", type=int, default=5_000, help="documents per insert_many")
+    parser.add_argument("--seed", type=int, default=1, help="same seed, same data")
+    parser.add_argument("--password", default="password", help="password for every seeded user (user<N>@example.com)")
+    parser.add_argument("--drop", action="store_true", help="drop seeded and derived collections first")
+    parser.add_argument("--rebuild", default="indexes,search,rollups,counts,alerts",
+                        help="derived data to rebuild afterwards (comma list, or 'none')")
+    opts = parser.parse_args()
+
+    db = connect()
+    if opts.drop:
+        for name in SEEDED + DERIVED:
+            db.drop_collection(name)
+        print("🗑️  Dropped old data.")
+    elif opts.users and db.users.find_one({"email": "user0@example.com"}):
+        print("⚠️ Seeded users already exist; use --drop (emails are unique).")
+        opts.users = 0
+
+    opts.spread = {kind: days_needed(kind, total, opts) for kind, total in (('scrapped_items', opts.items), ('live_searches', opts.live))}
+    for kind, days in opts.spread.items():
+        if days > opts.days:
+            print(f"📅 Spreading {kind} over {days} days to keep one row per product, source and day")
+
+    now = datetime.utcnow()
+    # One hash for everyone: hashing per user would dominate the run
+    password_hash = generate_password_hash(opts.password)
+    tasks = plan(opts, now, password_hash)
+
+    print(f"🌱 Generating {opts.items:,} items, {opts.live:,} live searches and {opts.users:,} users "
+          f"with {opts.processes} processes...")
+    started = time.monotonic()
+    totals = {}
+    with Pool(opts.processes) as pool:
+        for counts in pool.imap_unordered(load_range, tasks):
+            for name, count in counts.items():
+                totals[name] = totals.get(name, 0) + count
+            done = sum(totals.values())
+            progress = ", ".join(f"{name} {count:,}" for name, count in sorted(totals.items()))
+            print(f"   {progress}  ({done / (time.monotonic() - started):,.0f} docs/s)")
 
-# Generate History (Last 10 days)
-records = []
-today = datetime.utcnow()
-
-print("🌱 Generating data...")
-
-for i in range(10): # For past 10 days
-    date = today - timedelta(days=i)
-    
-    for county in counties:
-        for item in commodities:
-            for source in sources:
-                # Pick a random specific brand to simulate "Quality"
-                brand = random.choice(item['brands'])
-                full_name = f"{brand} {item['name']} {item['unit']}"
-                
-                # Randomize price slightly based on base price
-                price = item['base'] + random.uniform(-20, 20)
-                
-                record = {
-                    'commodity_name': item['name'],
-                    'product_name': full_name,
-                    'category': item['cat'],
-                    'unit': item['unit'],
-                    'county_name': county,
-                    'price': round(price, 2),
-                    'source': source,
-                    'created_at': date
-                }
-                records.append(record)
-
-# Insert all at once
-if records:
-    db.prices.insert_many(records)
-    print(f"✅ Successfully inserted {len(records)} price records!")
-    print("🚀 Run 'python app.py' to see your dashboard.")
\ No newline at end of file
+    print(f"✅ Inserted {sum(totals.values()):,} documents in {time.monotonic() - started:.1f}s")
+    steps = set() if opts.rebuild == 'none' else set(opts.rebuild.split(","))
+    rebuild(db, steps)
+    print("🚀 Run 'python app.py' to see your dashboard.")
@@ -22,7 +22,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (chartCanvas.dataset.chart) {
             const chartData = JSON.parse(chartCanvas.dataset.chart);
             
-            new Chart(ctx, {
+            window.searchChart = new Chart(ctx, {
                 type: 'line',
                 data: chartData,
                 options: {
@@ -76,4 +76,122 @@ document.addEventListener('DOMContentLoaded', () => {
             });
         }
     }
-});
\ No newline at end of file
+
+    // LIVE RESULTS STREAM (search results page while a scrape job is running)
+    const vendorList = document.getElementById('vendorList');
+    if (vendorList && vendorList.dataset.streamUrl) {
+        streamResults(vendorList);
+    }
+});
+
+const SOURCE_COLORS = { 'Naivas': '#ef4444', 'Jumia': '#f97316', 'Carrefour': '#3b82f6' };
+const SOURCE_ICONS = { 'Naivas': '🔴', 'Jumia': '🟠', 'Carrefour': '🔵' };
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
+function vendorRow(item) {
+    const row = document.createElement('div');
+    row.dataset.source = item.source;
+    row.dataset.price = item.price;
+    row.className = 'p-4 flex items-center justify-between hover:bg-slate-50 dark:hover:bg-slate-700/30 transition';
+    row.innerHTML = `
+        <div class="flex items-center gap-4">
+            <div class="w-12 h-12 rounded-full flex items-center justify-center text-xl bg-slate-100 dark:bg-slate-700">${SOURCE_ICONS[item.source] || '🛒'}</div>
+            <div>
+                <h4 class="font-bold text-slate-900 dark:text-white">${escapeHtml(item.source)}</h4>
+                <p class="text-sm text-slate-500 dark:text-slate-400">${escapeHtml(item.product_name)}</p>
+                <p class="text-xs text-slate-400 dark:text-slate-500">${escapeHtml(item.description)}</p>
+            </div>
+        </div>
+        <div class="text-right">
+            <p class="font-bold text-lg text-slate-900 dark:text-white">KSh ${escapeHtml(item.price)}</p>
+        </div>`;
+    return row;
+}
+
+function refreshStats(vendorList) {
+    const rows = Array.from(vendorList.querySelectorAll('[data-source]'));
+    document.getElementById('optionCount').textContent = rows.length;
+    if (!rows.length) return;
+
+    const prices = rows.map(r => parseFloat(r.dataset.price));
+    const min = Math.min(...prices);
+    const best = rows[prices.indexOf(min)];
+    document.getElementById('bestDeal').classList.remove('hidden');
+    document.getElementById('bestName').textContent = best.querySelector('p').textContent;
+    document.getElementById('bestSource').textContent = best.dataset.source;
+    document.getElementById('bestPrice').textContent = best.dataset.price;
+    document.getElementById('avgPrice').textContent = (prices.reduce((a, b) => a + b, 0) / prices.length).toFixed(2);
+    document.getElementById('maxPrice').textContent = Math.max(...prices);
+
+    rows.forEach(row => {
+        const badge = row.querySelector('.lowest-badge');
+        if (badge) badge.remove();
+        if (parseFloat(row.dataset.price) === min) {
+            row.lastElementChild.insertAdjacentHTML('beforeend',
+                '<span class="lowest-badge text-xs text-emerald-600 font-bold bg-emerald-50 dark:bg-emerald-900/30 px-2 py-0.5 rounded">Lowest</span>');
+        }
+    });
+}
+
+function addChartPoint(item) {
+    const chart = window.searchChart;
+    if (!chart) return;
+    const label = new Date().toISOString().slice(0, 10);
+    let index = chart.data.labels.indexOf(label);
+    if (index === -1) {
+        chart.data.labels.push(label);
+        chart.data.datasets.forEach(ds => ds.data.push(null));
+        index = chart.data.labels.length - 1;
+    }
+    let dataset = chart.data.datasets.find(ds => ds.label === item.source);
+    if (!dataset) {
+        const color = SOURCE_COLORS[item.source] || '#10b981';
+        dataset = { label: item.source, data: chart.data.labels.map(() => null), borderColor: color, backgroundColor: color, fill: false, tension: 0.1 };
+        chart.data.datasets.push(dataset);
+    }
+    dataset.data[index] = item.price;
+    chart.update();
+}
+
+function streamResults(vendorList) {
+    const status = document.getElementById('streamStatus');
+    const events = new EventSource(vendorList.dataset.streamUrl);
+
+    events.addEventListener('source', (e) => {
+        const update = JSON.parse(e.data);
+        if (!update.found) return;
+        const existing = vendorList.querySelector(`[data-source="${CSS.escape(update.source)}"]`);
+        const row = vendorRow(update.item);
+        if (existing) existing.replaceWith(row); else vendorList.appendChild(row);
+        refreshStats(vendorList);
+        addChartPoint(update.item);
+    });
+
+    events.addEventListener('done', (e) => {
+        events.close();
+        const result = JSON.parse(e.data);
+        status.classList.remove('animate-pulse');
+        if (result.status === 'failed') {
+            status.textContent = `Search failed: ${result.error}`;
+        } else if (result.timed_out && result.status === 'queued') {
+            status.textContent = 'Your search is still queued behind other scrapes. Refresh in a few minutes to see the latest prices.';
+        } else if (result.timed_out) {
+            status.textContent = `Still checking ${result.pending.join(', ')}. Refresh in a few minutes to see the latest prices.`;
+        } else if (!vendorList.querySelector('[data-source]')) {
+            status.textContent = 'No supermarket had this item.';
+        } else {
+            status.textContent = 'All supermarkets checked.';
+        }
+    });
+
+    events.onerror = () => {
+        events.close();
+        status.classList.remove('animate-pulse');
+        status.textContent = 'Lost connection to live updates. Refresh to see the latest prices.';
+    };
+}
@@ -0,0 +1,114 @@
+import os
+import re
+import threading
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from metrics import timed, DB_RECORDS
+
+# --- CONFIGURATION ---
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", 500))
+
+# Fields that identify one observation: a product seen at a source for a search on a given day
+RECORD_KEY = ('source', 'product_name', 'search_term', 'day')
+
+# --- INGEST HOOKS ---
+# Called as hook(db, collection_name, records, inserted) after every flush, e.g. to refresh
+# summaries. `inserted` is the subset of records that created a new row rather than updating one.
+INGEST_HOOKS = []
+
+def on_ingest(fn):
+    INGEST_HOOKS.append(fn)
+    return fn
+
+# Quantities are written one way: "1 Kg", "1.0kg" and "1 KGS" all become "1kg"
+UNIT_PATTERN = re.compile(r"\b(\d+(?:\.\d+)?)\s*(kgs?|grams?|gms?|g|ml|ltrs?|litres?|liters?|l|pieces|pcs|pc|packs?|rolls?)\b")
+UNIT_ALIASES = {
+    'kgs': 'kg', 'gram': 'g', 'grams': 'g', 'gm': 'g', 'gms': 'g',
+    'ltr': 'l', 'ltrs': 'l', 'litre': 'l', 'litres': 'l', 'liter': 'l', 'liters': 'l',
+    'pieces': 'pcs', 'pc': 'pcs', 'packs': 'pack', 'roll': 'rolls',
+}
+
+def _unit(match):
+    amount, unit = match.group(1), match.group(2)
+    if "." in amount:
+        amount = amount.rstrip("0").rstrip(".")
+    return amount + UNIT_ALIASES.get(unit, unit)
+
+def normalize_term(term):
+    """Canonical form of a search term so "Sugar 1kg", " sugar  1KG" and "Sugar 1 Kg" share history."""
+    return UNIT_PATTERN.sub(_unit, " ".join((term or "").lower().split()))
+
+def unit_of(text):
+    """The first quantity in a name, in normalize_term's form ('1 KGS' -> '1kg'), or None."""
+    match = UNIT_PATTERN.search((text or "").lower())
+    return _unit(match) if match else None
+
+def tokens(text):
+    """Words of a normalized term or name; decimals such as '1.5kg' stay one token."""
+    return set(re.findall(r"[a-z0-9]+(?:\.[a-z0-9]+)*", text))
+
+def day_of(moment):
+    return datetime(moment.year, moment.month, moment.day)
+
+class RecordWriter:
+    """Buffers scraped records and flushes them as unordered bulk upserts, so re-running a
+    scrape on the same day updates that day's rows instead of adding new ones."""
+    def __init__(self, db, collection_name, batch_size=WRITE_BATCH_SIZE):
+        self.db = db
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self._buffer = {}
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        record = dict(record)
+        record.setdefault('created_at', datetime.utcnow())
+        record['day'] = day_of(record['created_at'])
+        key = tuple(record[field] for field in RECORD_KEY)
+
+        with self._lock:
+            self._buffer[key] = record
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            records = list(self._buffer.values())
+            self._buffer = {}
+        if not records:
+            return 0
+
+        operations = [
+            UpdateOne(
+                {field: record[field] for field in RECORD_KEY},
+                {"$set": record, "$setOnInsert": {"first_seen_at": record['created_at']}},
+                upsert=True
+            )
+            for record in records
+        ]
+        with timed("db_write", self.collection_name, records=len(records)):
+            try:
+                upserted = self.db[self.collection_name].bulk_write(operations, ordered=False).upserted_ids
+            except BulkWriteError as e:
+                # Another writer inserted the same RECORD_KEY between our match and insert: that
+                # row is already written (the unique index keeps it to one)
+                if any(err['code'] != 11000 for err in e.details.get('writeErrors', [])):
+                    raise
+                upserted = {u['index']: u['_id'] for u in e.details.get('upserted', [])}
+        DB_RECORDS.inc(len(records), collection=self.collection_name)
+        inserted = [records[i] for i in upserted]
+
+        for hook in INGEST_HOOKS:
+            try:
+                hook(self.db, self.collection_name, records, inserted)
+            except Exception as e:
+                print(f"⚠️ Ingest hook {hook.__name__} failed: {e}")
+        return len(records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
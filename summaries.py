@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+from collections import Counter
+from storage import on_ingest
+
+# --- CATEGORY SUMMARY ---
+# Per-category row counts for scrapped_items, kept in db.category_counts by the ingest hook
+# below so page views never scan the price history. Web processes also cache the result
+# for a short while; scrapes usually run in worker processes, hence the TTL.
+CACHE_SECONDS = float(os.environ.get("CATEGORY_CACHE_SECONDS", 60))
+DEFAULT_CATEGORIES = ['Food', 'Home']
+
+_cache = {'at': 0.0, 'value': None}
+_cache_lock = threading.Lock()
+
+def invalidate():
+    with _cache_lock:
+        _cache['value'] = None
+
+def rebuild_category_counts(db):
+    """Recomputes every category count with a single $group over scrapped_items."""
+    pipeline = [
+        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+        {"$out": "category_counts"},
+    ]
+    db.scrapped_items.aggregate(pipeline)
+    invalidate()
+
+def category_summary(db):
+    """[{'name', 'count'}] for every category, served from cache when possible."""
+    with _cache_lock:
+        if _cache['value'] is not None and time.monotonic() - _cache['at'] < CACHE_SECONDS:
+            return _cache['value']
+
+    rows = list(db.category_counts.find())
+    if not rows and db.scrapped_items.estimated_document_count():
+        rebuild_category_counts(db)
+        rows = list(db.category_counts.find())
+
+    summary = sorted(({"name": r['_id'], "count": r['count']} for r in rows if r['_id']), key=lambda c: c['name'])
+    if not summary:
+        summary = [{"name": c, "count": 0} for c in DEFAULT_CATEGORIES]
+
+    with _cache_lock:
+        _cache['value'] = summary
+        _cache['at'] = time.monotonic()
+    return summary
+
+@on_ingest
+def count_new_items(db, collection_name, records, inserted):
+    if collection_name != 'scrapped_items' or not inserted:
+        return
+    for category, count in Counter(r.get('category') for r in inserted).items():
+        db.category_counts.update_one({"_id": category}, {"$inc": {"count": count}}, upsert=True)
+    invalidate()
+
+if __name__ == '__main__':
+    from database import connect
+    rebuild_category_counts(connect())
+    print("✅ Rebuilt category_counts")
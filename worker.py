@@ -0,0 +1,90 @@
+import argparse
+import os
+import socket
+import time
+from multiprocessing import Process
+import jobs
+import retention
+import metrics
+from database import connect, check_server_version
+from indexes import ensure_indexes
+from driver_pool import get_pool
+from scraper import scrape_real_data, scrape_single_item
+
+POLL_INTERVAL = float(os.environ.get("WORKER_POLL_INTERVAL", 1.0))
+# Each worker process serves /metrics on METRICS_PORT + its index; unset disables it
+METRICS_PORT = os.environ.get("WORKER_METRICS_PORT")
+
+def run_job(db, job):
+    """Executes one claimed job and returns its result document."""
+    params = job.get('params', {})
+
+    def on_progress(done, total):
+        jobs.report_progress(db, job['_id'], done, total)
+
+    if job['kind'] == 'dashboard':
+        return {'count': scrape_real_data(db, on_progress=on_progress)}
+    if job['kind'] == 'item':
+        finished = set()
+
+        def on_source_done(source, found):
+            jobs.report_source(db, job['_id'], source, found)
+            # Only once reported, so a source missing from the stored result is listed as late
+            finished.add(source)
+
+        count = scrape_single_item(db, params['item_name'], params.get('targets'),
+                                   on_progress=on_progress, on_source_done=on_source_done)
+        # Sources past the deadline keep running and still report into the job
+        late = sorted(set(params.get('targets') or []) - finished)
+        return {'count': count, 'late': late}
+    raise ValueError(f"Unknown job kind: {job['kind']}")
+
+def work_loop(index=0):
+    metrics.configure_logging()
+    if METRICS_PORT:
+        metrics.start_http_server(int(METRICS_PORT) + index)
+    db = connect()
+    check_server_version(db)
+    ensure_indexes(db)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    get_pool().warm()
+    print(f"👷 Worker {worker_id} ready")
+
+    while True:
+        try:
+            jobs.requeue_stale(db)
+            # At most one worker compacts old price rows per interval (see retention.py)
+            retention.run_if_due(db, worker_id)
+            job = jobs.claim(db, worker_id)
+        except Exception as e:
+            # A database outage or a failed compaction must not end the worker
+            print(f"⚠️ {worker_id} housekeeping failed: {e}")
+            job = None
+        if not job:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        print(f"👷 {worker_id} running {job['kind']} job {job['_id']}")
+        try:
+            jobs.finish(db, job['_id'], run_job(db, job))
+        except Exception as e:
+            print(f"❌ Job {job['_id']} failed: {e}")
+            try:
+                jobs.fail(db, job['_id'], e)
+            except Exception as e:
+                # Left running; requeue_stale picks it up again
+                print(f"⚠️ Could not mark job {job['_id']} failed: {e}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs queued scrape jobs.")
+    parser.add_argument("--processes", type=int, default=int(os.environ.get("WORKER_PROCESSES", 1)))
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        work_loop()
+    else:
+        workers = [Process(target=work_loop, args=(i,)) for i in range(args.processes)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()